@@ -0,0 +1,45 @@
+import argparse
+import json
+from dataclasses import asdict
+
+from .mock_server import MockConfig
+from .runner import HEADER, SCENARIOS, run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks the clients against an in-process mock Monitor API.")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"One of {', '.join(SCENARIOS)}. All by default.")
+    parser.add_argument("--client", action="append", choices=["sync", "async", "asgi"], help="Client to run, repeatable. sync and async by default.")
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many seconds added at random")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--payload-size", type=int, default=200, help="Approximate bytes per record")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--session-lifetime", type=int, default=None, help="Requests until the session expires with 401")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the second run measuring peak memory")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per result")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    config = MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        rows=args.rows,
+        payload_size=args.payload_size,
+        error_rate=args.error_rate,
+        session_lifetime=args.session_lifetime,
+    )
+    if not args.json:
+        print(HEADER)
+    for name in args.scenarios or SCENARIOS:
+        for kind in args.client or ["sync", "async"]:
+            result = run(SCENARIOS[name], kind, args.operations, args.concurrency, config, measure_memory=not args.no_memory)
+            print(json.dumps(asdict(result)) if args.json else result.format(), flush=True)
+
+
+if __name__ == "__main__":
+    main()
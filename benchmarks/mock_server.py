@@ -0,0 +1,186 @@
+import asyncio
+import httpx
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, MutableMapping
+from urllib.parse import parse_qsl
+
+
+SESSION_HEADER = "x-monitor-sessionid"
+
+_ID_COMPARISON = re.compile(r"\bId (ge|gt|lt|le|eq) (\d+)")
+
+
+@dataclass
+class MockConfig:
+    """
+    Behaviour of the mock Monitor API.
+
+    latency: seconds added to every response, plus up to `jitter` seconds at random.
+    rows: number of records of every entity, each padded to about `payload_size` bytes.
+    error_rate: share of API requests answered with 500.
+    session_lifetime: number of API requests a session is valid for before it answers 401, None for no expiry.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    rows: int = 10000
+    payload_size: int = 200
+    error_rate: float = 0.0
+    session_lifetime: int | None = None
+    seed: int = 0
+
+
+class MockMonitor:
+    """
+    In-process emulation of the Monitor API for benchmarks.
+
+    Login hands out a new session id and ends the previous one, like Monitor allows only one session per user.
+    Queries support an id, $top, $skip and Id comparisons in $filter. Commands, /Many and /Batch answer with generated ids.
+    Use `transport()` with a SyncClient or AsyncClient, or the instance itself as an ASGI application.
+    """
+
+    def __init__(self, config: MockConfig | None = None) -> None:
+        self.config = config or MockConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._session_id: str | None = None
+        self._session_requests = 0
+        self._entity_id = 0
+        self._padding = "x" * max(self.config.payload_size - 40, 0)
+        self.logins = 0
+        self.requests = 0
+
+    def transport(self) -> httpx.MockTransport:
+        """
+        Transport for SyncClient and AsyncClient. Latency blocks the thread on a SyncClient and sleeps on an AsyncClient.
+        """
+        return _MockMonitorTransport(self)
+
+    def asgi_transport(self) -> httpx.ASGITransport:
+        """
+        Transport for AsyncClient passing every request through the ASGI application, like a local server would.
+        """
+        return httpx.ASGITransport(app=self)
+
+    def _record(self, id: int) -> dict[str, Any]:
+        return {"Id": id, "PartNumber": f"P{id}", "Description": self._padding}
+
+    def _delay(self) -> float:
+        if not self.config.latency and not self.config.jitter:
+            return 0.0
+        return self.config.latency + self._random.uniform(0, self.config.jitter)
+
+    def respond(self, method: str, path: str, query: str, headers: dict[str, str], body: bytes) -> tuple[int, dict[str, str], bytes]:
+        with self._lock:
+            self.requests += 1
+            if path.endswith("/login"):
+                self.logins += 1
+                self._session_id = uuid.uuid4().hex
+                self._session_requests = 0
+                return 200, {SESSION_HEADER: self._session_id}, b'{"SessionSuspended": false}'
+            lifetime = self.config.session_lifetime
+            if headers.get(SESSION_HEADER) != self._session_id or (lifetime is not None and self._session_requests >= lifetime):
+                return 401, {}, b"Invalid session id"
+            self._session_requests += 1
+            if self.config.error_rate and self._random.random() < self.config.error_rate:
+                return 500, {}, b"Injected error"
+            self._entity_id += 1
+            entity_id = self._entity_id
+
+        if method == "GET":
+            return self._query(path, dict(parse_qsl(query)))
+        if path.endswith("/Batch") or "/Batch/" in path:
+            commands = json.loads(body)
+            responses = [{"Path": command["Path"], "Result": {"EntityId": entity_id + index}} for index, command in enumerate(commands)]
+            return 200, {}, json.dumps({"IsSuccessful": True, "ErrorMessage": None, "FailingIndex": None, "Responses": responses}).encode()
+        if "/Many" in path:
+            items = json.loads(body) or []
+            return 200, {}, json.dumps([{"EntityId": entity_id + index} for index in range(len(items))]).encode()
+        return 200, {}, json.dumps({"EntityId": entity_id}).encode()
+
+    def _query(self, path: str, params: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+        last = path.rstrip("/").rsplit("/", 1)[-1]
+        if last.isdigit():
+            id = int(last)
+            if not 1 <= id <= self.config.rows:
+                return 404, {}, b"Entity not found"
+            return 200, {}, json.dumps(self._record(id)).encode()
+        filter = params.get("$filter", "")
+        comparisons = [(operator, int(value)) for operator, value in _ID_COMPARISON.findall(filter)]
+        ids: range | list[int] = range(1, self.config.rows + 1)
+        if " or " in filter:
+            ids = sorted({value for operator, value in comparisons if operator == "eq" and 1 <= value <= self.config.rows})
+        else:
+            lower, upper = 1, self.config.rows + 1
+            for operator, value in comparisons:
+                if operator in ("ge", "gt", "eq"):
+                    lower = max(lower, value + (operator == "gt"))
+                if operator in ("lt", "le", "eq"):
+                    upper = min(upper, value + (operator != "lt"))
+            ids = range(lower, max(lower, upper))
+        skip = int(params.get("$skip", 0))
+        top = int(params["$top"]) if "$top" in params else len(ids)
+        return 200, {}, json.dumps([self._record(id) for id in ids[skip:skip + top]]).encode()
+
+    async def __call__(self,
+        scope: MutableMapping[str, Any],
+        receive: Callable[[], Awaitable[MutableMapping[str, Any]]],
+        send: Callable[[MutableMapping[str, Any]], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        status, response_headers, content = self.respond(scope["method"], scope["path"], scope["query_string"].decode(), headers, body)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), *((name.encode(), value.encode()) for name, value in response_headers.items())],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+class _MockMonitorTransport(httpx.MockTransport):
+
+    def __init__(self, monitor: MockMonitor) -> None:
+        super().__init__(self._handle)
+        self.monitor = monitor
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        status, headers, content = self.monitor.respond(
+            request.method, request.url.path, request.url.query.decode(), dict(request.headers), request.content
+        )
+        return httpx.Response(status, headers=headers, content=content)
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        delay = self.monitor._delay()
+        if delay:
+            time.sleep(delay)
+        return self._respond(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        delay = self.monitor._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(request)
+
+
+def create_app() -> MockMonitor:
+    """
+    ASGI application factory for running the mock as a server, e.g. uvicorn --factory benchmarks.mock_server:create_app
+    """
+    return MockMonitor()
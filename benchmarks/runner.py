@@ -0,0 +1,189 @@
+import asyncio
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Literal
+
+from monitorapi.async_client import AsyncClient
+from monitorapi.base_client import BaseClient
+from monitorapi.session_store import MemorySessionStore
+from monitorapi.sync_client import SyncClient
+from monitorapi import exceptions as exc
+
+from .mock_server import MockConfig, MockMonitor
+
+
+ClientKind = Literal["sync", "async", "asgi"]
+
+@dataclass
+class Scenario:
+    """
+    `make` is called with the client and the mock's config and returns the operation to run for every index.
+    `config` overrides fields of the MockConfig for this scenario.
+    """
+    name: str
+    make: Callable[[BaseClient, MockConfig], Callable[[int], Any]]
+    config: dict[str, Any]
+
+
+def _query_by_id(client: BaseClient, config: MockConfig) -> Callable[[int], Any]:
+    rows = config.rows
+    return lambda index: client.query("Inventory", "Parts", id=index % rows + 1)
+
+def _query_page(client: BaseClient, config: MockConfig) -> Callable[[int], Any]:
+    rows = config.rows
+    return lambda index: client.query("Inventory", "Parts", orderby="Id", top=100, skip=index * 100 % rows)
+
+def _prepared_query(client: BaseClient, config: MockConfig) -> Callable[[int], Any]:
+    rows = config.rows
+    prepared = client.prepare_query("Inventory", "Parts", select="Id,PartNumber,Description")
+    return lambda index: prepared(index % rows + 1)
+
+def _command(client: BaseClient, config: MockConfig) -> Callable[[int], Any]:
+    return lambda index: client.command("Inventory", "Parts", "Update", body={"PartId": index})
+
+def _many(client: BaseClient, config: MockConfig) -> Callable[[int], Any]:
+    return lambda index: client.command("Inventory", "Parts", "Update", many=True, body=[{"PartId": index * 100 + item} for item in range(100)])
+
+def _batch(client: BaseClient, config: MockConfig) -> Callable[[int], Any]:
+    return lambda index: client.batch([
+        {"Path": "Inventory/Parts/Create", "Body": {"PartNumber": f"B{index}-{item}"}, "ForwardPropertyName": None, "ReceivingPropertyName": None}
+        for item in range(10)
+    ])
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("query_by_id", _query_by_id, {}),
+        Scenario("query_page", _query_page, {}),
+        Scenario("prepared_query", _prepared_query, {}),
+        Scenario("command", _command, {}),
+        Scenario("many", _many, {}),
+        Scenario("batch", _batch, {}),
+        Scenario("relogin", _query_by_id, {"session_lifetime": 50}),
+    )
+}
+
+
+@dataclass
+class Result:
+    scenario: str
+    client: ClientKind
+    operations: int
+    errors: int
+    requests: int
+    logins: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p99_ms: float
+    cpu_ms_per_request: float
+    peak_memory_kib: float | None
+
+    def format(self) -> str:
+        memory = f"{self.peak_memory_kib:10.0f}" if self.peak_memory_kib is not None else f"{'-':>10}"
+        return (
+            f"{self.scenario:<16}{self.client:<7}{self.operations:>7}{self.errors:>7}{self.requests:>9}{self.logins:>7}"
+            f"{self.throughput:>10.0f}{self.p50_ms:>9.2f}{self.p99_ms:>9.2f}{self.cpu_ms_per_request:>9.3f}{memory}"
+        )
+
+HEADER = f"{'scenario':<16}{'client':<7}{'ops':>7}{'errors':>7}{'requests':>9}{'logins':>7}{'ops/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'cpu ms':>9}{'peak KiB':>10}"
+
+
+def _percentile(latencies: list[float], q: float) -> float:
+    if not latencies:
+        return 0.0
+    latencies = sorted(latencies)
+    return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+
+def _create_client(kind: ClientKind, monitor: MockMonitor, concurrency: int) -> BaseClient:
+    client: BaseClient
+    if kind == "sync":
+        client = SyncClient("001.1", "bench", "bench", "https://monitor.local", max_workers=concurrency, transport=monitor.transport(), session_store=MemorySessionStore())
+    else:
+        transport = monitor.asgi_transport() if kind == "asgi" else monitor.transport()
+        client = AsyncClient("001.1", "bench", "bench", "https://monitor.local", transport=transport, session_store=MemorySessionStore())
+    return client
+
+def _run_sync(client: SyncClient, operation: Callable[[int], Any], operations: int) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors: list[exc.Base] = []
+
+    def timed(index: int) -> None:
+        started = time.perf_counter()
+        try:
+            operation(index)
+        except exc.Base as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - started)
+
+    client.map(timed, range(operations))
+    client.close()
+    return latencies, len(errors)
+
+async def _run_async(client: AsyncClient, operation: Callable[[int], Any], operations: int, concurrency: int) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await operation(index)
+            except exc.Base:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(timed(index) for index in range(operations)))
+    await client.close()
+    return latencies, errors
+
+def _execute(scenario: Scenario, kind: ClientKind, operations: int, concurrency: int, config: MockConfig) -> tuple[MockMonitor, list[float], int]:
+    monitor = MockMonitor(replace(config, **scenario.config))
+    client = _create_client(kind, monitor, concurrency)
+    operation = scenario.make(client, monitor.config)
+    if isinstance(client, SyncClient):
+        latencies, errors = _run_sync(client, operation, operations)
+    else:
+        latencies, errors = asyncio.run(_run_async(client, operation, operations, concurrency))  # type: ignore[arg-type]
+    return monitor, latencies, errors
+
+def run(scenario: Scenario, kind: ClientKind, operations: int = 1000, concurrency: int = 8, config: MockConfig | None = None, measure_memory: bool = True) -> Result:
+    """
+    Runs `operations` calls of the scenario with at most `concurrency` at once.
+    Peak memory is measured with tracemalloc in a second run, so it does not slow down the timed one.
+    CPU time per request includes the work of the in-process mock.
+    """
+    config = config or MockConfig()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    monitor, latencies, errors = _execute(scenario, kind, operations, concurrency, config)
+    seconds = time.perf_counter() - wall
+    cpu_seconds = time.process_time() - cpu
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            _execute(scenario, kind, operations, concurrency, config)
+            peak_memory = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+    return Result(
+        scenario=scenario.name,
+        client=kind,
+        operations=operations,
+        errors=errors,
+        requests=monitor.requests,
+        logins=monitor.logins,
+        seconds=seconds,
+        throughput=operations / seconds if seconds else 0.0,
+        p50_ms=_percentile(latencies, 0.5),
+        p99_ms=_percentile(latencies, 0.99),
+        cpu_ms_per_request=cpu_seconds * 1000 / max(monitor.requests, 1),
+        peak_memory_kib=peak_memory,
+    )
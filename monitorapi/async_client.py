@@ -1,75 +1,561 @@
 import httpx
 import logging
 import asyncio
-from typing import Any
+import itertools
+import math
+import time
+from collections import deque
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Literal
 
-from .base_client import BaseClient, BatchCommandEntity
+from .base_client import BaseClient, BatchCommandEntity, DEFAULT_LIMITS, X_MONITOR_SESSION_ID_HEADER
 from .import exceptions as exc
+from .cache import request_key
+from .chunking import merge_batch_responses, merge_many_responses, split_batch, split_many
+from .circuit import CircuitBreaker
+from .columnar import ResultFormat, convert
+from .deadline import bound_stream, bound_timeout, check_deadline, remaining
+from .filters import Expression
+from .limiter import AsyncLimiter, endpoint_class, is_overload
+from .prepared import PreparedCommand, PreparedQuery
+from .scheduler import AsyncScheduler, current_priority
+from .streaming import JSONArrayDecoder
 
 
 logger = logging.getLogger(__name__)
 
+_DONE = object()
+
 class AsyncClient(BaseClient):
 
-    def __init__(self, company_number, username, password, base_url, language_code = "en", api_version = "v1", x_monitor_session_id = None, timeout = 10) -> None:
-        super().__init__(company_number, username, password, base_url, language_code, api_version, x_monitor_session_id, timeout)
-        self.client = httpx.AsyncClient(timeout=timeout, verify=False)
+    def __init__(self, company_number, username, password, base_url, language_code = "en", api_version = "v1", x_monitor_session_id = None, timeout = 10, cache = None, coalesce_queries = False, limits = None, http2 = False, transport = None, limiter = None, retry = None, log_body_limit = 1000, trace_hook = None, metrics = None, session_store = None, circuit_breaker = None, scheduler = None) -> None:
+        super().__init__(company_number, username, password, base_url, language_code, api_version, x_monitor_session_id, timeout, cache, coalesce_queries, retry, log_body_limit, trace_hook, metrics, session_store)
+        # A transport passed in may be shared with other clients, it brings its own limits and HTTP/2 setting
+        self.client = httpx.AsyncClient(timeout=timeout, verify=False, limits=limits or DEFAULT_LIMITS, http2=http2, transport=transport)
+        self._owns_transport = transport is None
+        self.limiter: AsyncLimiter | None = limiter
+        self.circuit_breaker: CircuitBreaker | None = circuit_breaker
+        self.scheduler: AsyncScheduler | None = scheduler
         self._condition = asyncio.Condition()
         self._login_happening = False
+        self._inflight_queries: dict[str, asyncio.Future[Any]] = {}
+
+    async def close(self) -> None:
+        if self._owns_transport:
+            await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
 
-    async def _make_api_request(self, request: httpx.Request) -> httpx.Response:
+    async def _make_api_request(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
         async with self._condition:
-            while self._login_happening:
-                await self._condition.wait()
+            await self._wait_for_login()
+        check_deadline()
+        group = self.circuit_breaker.acquire(request) if self.circuit_breaker is not None else None
+        priority = None
+        try:
+            if self.scheduler is not None:
+                priority, waited = await self.scheduler.acquire(remaining())
+                if self.metrics is not None:
+                    self.metrics.record_queue_wait(priority, waited)
+            started = await self.limiter.acquire(endpoint_class(request), remaining()) if self.limiter else None
+        except BaseException:
+            if priority is not None:
+                self.scheduler.release(priority)  # type: ignore[union-attr]
+            if group is not None:
+                self.circuit_breaker.cancel(group)  # type: ignore[union-attr]
+            raise
+        timer = self.metrics.request_started() if self.metrics is not None else None
+        cancelled = False
+        # None when the request neither got a response nor failed in transport, e.g. it was cancelled
+        failed: bool | None = None
         try:
             response = None
-            request = self._refresh_auth_header(request)
-            response = await self.client.send(request)
+            request = bound_timeout(self._refresh_auth_header(request), self.client.timeout)
+            response = await self._send(request, stream)
 
             if self._needs_retry(response):
-                await self.login()
-                request = self._refresh_auth_header(request)
-                response = await self.client.send(request)
+                if stream:
+                    await response.aclose()
+                await self._login(request.headers[X_MONITOR_SESSION_ID_HEADER])
+                request = bound_timeout(self._refresh_auth_header(request), self.client.timeout)
+                response = await self._send(request, stream)
             
+            failed = is_overload(response)
             return response
+        except exc.DeadlineExceeded:
+            failed = True
+            raise
         except httpx.HTTPError as e:
+            failed = True
+            if isinstance(e, httpx.TimeoutException):
+                check_deadline()
             http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
             raise exc.RequestError(http_error)
+        except asyncio.CancelledError:
+            # Prefetched pages and hedged queries are cancelled when no longer needed, which is not a failed request
+            cancelled = True
+            raise
         finally:
-            self._log_request_response(request, response)
+            if priority is not None:
+                self.scheduler.release(priority)  # type: ignore[union-attr]
+            if group is not None:
+                if failed is None:
+                    self.circuit_breaker.cancel(group)  # type: ignore[union-attr]
+                else:
+                    self.circuit_breaker.release(group, failed)  # type: ignore[union-attr]
+            if self.limiter and started is not None:
+                await self.limiter.release(started, failed)
+            if self.metrics is not None and timer is not None:
+                self.metrics.request_finished(request, response, timer)
+            if cancelled:
+                logger.debug("%s %s cancelled", request.method, request.url)
+            else:
+                self._log_request_response(request, response)
+
+    async def _send(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        """
+        Sends the request. Under a deadline sending and reading the body are bounded by the time left,
+        since the httpx timeouts only limit every single read and a slow body could outlast the deadline.
+        """
+        left = remaining()
+        if left is None:
+            return await self.client.send(request, stream=stream)
+        try:
+            response = await asyncio.wait_for(self.client.send(request, stream=stream), left)
+        except asyncio.TimeoutError:
+            raise exc.DeadlineExceeded("Deadline exceeded")
+        return bound_stream(response) if stream else response
+
+    async def _wait_for_login(self) -> None:
+        """
+        Waits while another task logs in, at most until the deadline. Must be called holding self._condition.
+        """
+        if not self._login_happening:
+            return
+        waiting = time.monotonic()
+        while self._login_happening:
+            left = check_deadline()
+            try:
+                await asyncio.wait_for(self._condition.wait(), left)
+            except asyncio.TimeoutError:
+                pass
+        if self.metrics is not None:
+            self.metrics.record_login_wait(time.monotonic() - waiting)
 
     async def login(self):
-        self._login_happening = True
+        await self._login()
+
+    async def _acquire_session_store(self) -> None:
+        """
+        Waits for the session store's lock in a thread, since another process may hold it, at most until the deadline.
+        If the task is cancelled meanwhile, the lock is released as soon as the thread got it.
+        """
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.session_store.acquire, self.session_key, check_deadline()))
         try:
-            response = None
-            request = self._create_login_request()
+            acquired = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(lambda future: future.exception() is None and future.result() and self.session_store.release(self.session_key))
+            raise
+        if not acquired:
+            raise exc.DeadlineExceeded("Deadline exceeded waiting for the session store")
+
+    async def _login(self, rejected_session_id: str | None = None) -> None:
+        """
+        Only one task logs in at a time, the others wait until it is done.
+        A task whose request was rejected skips the login if the session id was already refreshed by another task,
+        or by another client sharing the session store, which is locked during the login.
+        """
+        async with self._condition:
+            await self._wait_for_login()
+            if rejected_session_id is not None and rejected_session_id != self.x_monitor_session_id:
+                return
+            self._login_happening = True
+        try:
+            await self._acquire_session_store()
             try:
-                response = await self.client.send(request)
-                self._handle_login_response(response)
-            except httpx.HTTPError as e:
-                http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
-                raise exc.RequestError(http_error)
+                if self._adopt_stored_session(rejected_session_id):
+                    return
+                if self.metrics is not None:
+                    self.metrics.record_login()
+                response = None
+                request = bound_timeout(self._create_login_request(), self.client.timeout)
+                try:
+                    response = await self._send(request)
+                    self._handle_login_response(response)
+                except httpx.HTTPError as e:
+                    if isinstance(e, httpx.TimeoutException):
+                        check_deadline()
+                    http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
+                    raise exc.RequestError(http_error)
+                finally:
+                    self._log_request_response(request, response)
+            finally:
+                self.session_store.release(self.session_key)
         finally:
             self._login_happening = False
             async with self._condition:
                 self._condition.notify_all()
-            self._log_request_response(request, response)
 
     async def query(self,
         module: str,
         entity: str,
         id: int | None = None,
         language: str | None  = None,
-        filter: str  | None = None,
+        filter: Expression | str | None = None,
         select: str | None = None,
         expand: str | None = None,
         orderby: str | None = None,
         top: int | None = None,
-        skip: int | None = None
+        skip: int | None = None,
+        result_format: ResultFormat = "dicts",
     ) -> Any:
         request = self._create_query_request(module, entity, id, language, filter, select, expand, orderby, top, skip)
+        result = await self._query(request, module, entity)
+        return convert(result, select, result_format)
+
+    async def _query(self, request: httpx.Request, module: str, entity: str) -> Any:
+        cached = self._get_cached_query(request)
+        if cached is not None:
+            return cached
+        if not self.coalesce_queries:
+            return await self._send_query(request, module, entity)
+
+        key = request_key(request)
+        if self.scheduler is not None:
+            # The request waits for a slot in the class of the caller that sent it, so only callers of one class share it
+            key = f"{current_priority() or self.scheduler.default} {key}"
+        while True:
+            future = self._inflight_queries.get(key)
+            leader = future is None
+            if future is None:
+                future = asyncio.ensure_future(self._send_query(request, module, entity))
+                self._inflight_queries[key] = future
+                future.add_done_callback(lambda _: self._inflight_queries.pop(key, None))
+            left = check_deadline()
+            try:
+                # Shielded so a cancelled caller does not cancel the request the other callers wait on
+                return await asyncio.wait_for(asyncio.shield(future), left)
+            except asyncio.TimeoutError:
+                raise exc.DeadlineExceeded("Deadline exceeded waiting for a coalesced query")
+            except exc.DeadlineExceeded:
+                # The request ran out of the deadline of the caller that sent it, not of this one, send it again
+                if leader:
+                    raise
+            except asyncio.CancelledError:
+                # Only the request was cancelled, not this caller
+                if leader or not future.cancelled():
+                    raise
+
+    async def _send_query(self, request: httpx.Request, module: str, entity: str) -> Any:
+        response, result = await self._retry(partial(self._hedge, partial(self._query_attempt, request)), idempotent=True)
+        self._set_cached_query(request, response, module, entity)
+        return result
+
+    async def _query_attempt(self, request: httpx.Request) -> tuple[httpx.Response, Any]:
+        started = time.monotonic()
         response = await self._make_api_request(request)
-        return self._handle_query_response(response)
+        result = self._handle_query_response(response)
+        if self.retry is not None:
+            self.retry.latencies.record(time.monotonic() - started)
+        return response, result
+
+    async def _send_command(self, request: httpx.Request, handler: Callable[[httpx.Response], Any], invalidated_paths: list[str]) -> Any:
+        response = await self._make_api_request(request)
+        self._invalidate_cache(*invalidated_paths)
+        return handler(response)
+
+    async def _retry(self, call: Callable[[], Awaitable[Any]], idempotent: bool) -> Any:
+        attempts: dict[type[exc.Base], int] = {}
+        while True:
+            try:
+                return await call()
+            except exc.Base as e:
+                if self.metrics is not None:
+                    self.metrics.record_error(e)
+                delay = self.retry.next_delay(e, idempotent, attempts) if self.retry is not None else None
+                if delay is None:
+                    raise
+                left = remaining()
+                if left is not None and delay >= left:
+                    raise
+                logger.info("Retrying after %s in %.3fs", e.__class__.__name__, delay)
+                await asyncio.sleep(delay)
+
+    async def _hedge(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        delay = self.retry.hedge_delay() if self.retry is not None else None
+        if delay is None:
+            return await call()
+        first = asyncio.ensure_future(call())
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        logger.debug("No response after %.3fs, sending hedged request", delay)
+        pending = {first, asyncio.ensure_future(call())}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda task: task.exception() is not None):
+                    if task.exception() is None or not pending:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def prepare_query(self,
+        module: str,
+        entity: str,
+        language: str | None = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        result_format: ResultFormat = "dicts",
+    ) -> PreparedQuery:
+        return PreparedQuery(self, module, entity, language, filter, select, expand, orderby, result_format)
+
+    async def _query_prepared(self, prepared: PreparedQuery, request: httpx.Request) -> Any:
+        result = await self._query(request, prepared.module, prepared.entity)
+        return convert(result, prepared.select, prepared.result_format)
+
+    def prepare_command(self,
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+    ) -> PreparedCommand:
+        return PreparedCommand(self, module, namespace, command, many, simulate, validate, language)
+
+    async def _command_prepared(self, prepared: PreparedCommand, request: httpx.Request) -> Any:
+        return await self._retry(partial(self._send_command, request, self._handle_command_response, prepared.invalidated_paths), idempotent=False)
+
+    async def query_many(self,
+        module: str,
+        entity: str,
+        ids: Iterable[int],
+        language: str | None = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        max_url_length: int = 2000,
+        concurrency: int = 4,
+    ) -> dict[int, Any]:
+        id_filters, select = self._create_id_filters(module, entity, ids, language, filter, select, expand, max_url_length)
+        semaphore = asyncio.Semaphore(concurrency)
+        pages = await asyncio.gather(*(self._with_semaphore(semaphore, self.query(module, entity, None, language, id_filter, select, expand)) for id_filter in id_filters))
+        return {record["Id"]: record for page in pages for record in page}
+
+    async def join(self,
+        records: Iterable[dict[str, Any]],
+        key: str,
+        module: str,
+        entity: str,
+        into: str | None = None,
+        language: str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        max_url_length: int = 2000,
+        concurrency: int = 4,
+    ) -> list[dict[str, Any]]:
+        records = list(records)
+        ids = [record[key] for record in records if record.get(key) is not None]
+        index = await self.query_many(module, entity, ids, language, None, select, expand, max_url_length, concurrency)
+        return self._join_records(records, key, into or entity, index)
+
+    async def query_stream(self,
+        module: str,
+        entity: str,
+        id: int | None = None,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        top: int | None = None,
+        skip: int | None = None
+    ) -> AsyncIterator[Any]:
+        request = self._create_query_request(module, entity, id, language, filter, select, expand, orderby, top, skip)
+        response = await self._make_api_request(request, stream=True)
+        try:
+            if not response.is_success:
+                await response.aread()
+                self._handle_query_response(response)
+            decoder = JSONArrayDecoder()
+            async for chunk in response.aiter_text():
+                for record in decoder.feed(chunk):
+                    yield record
+            for record in decoder.close():
+                yield record
+        except httpx.HTTPError as e:
+            http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
+            raise exc.RequestError(http_error)
+        finally:
+            await response.aclose()
+
+    async def query_iter(self,
+        module: str,
+        entity: str,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        skip: int = 0,
+        page_size: int = 500,
+        prefetch: int = 1,
+        result_format: Literal["dicts", "records"] = "dicts",
+    ) -> AsyncIterator[Any]:
+        pending: deque[asyncio.Task[Any]] = deque()
+        next_skip = skip
+        try:
+            while True:
+                while len(pending) <= prefetch:
+                    pending.append(asyncio.create_task(self.query(module, entity, None, language, filter, select, expand, orderby, page_size, next_skip, result_format)))
+                    next_skip += page_size
+                page = await pending.popleft()
+                for record in page:
+                    yield record
+                if len(page) < page_size:
+                    return
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def query_partitioned(self,
+        module: str,
+        entity: str,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        partition_by: Literal["skip", "id"] = "skip",
+        partitions: int = 4,
+        concurrency: int | None = None,
+        page_size: int = 500,
+        ordered: bool = True,
+        result_format: Literal["dicts", "records"] = "dicts",
+    ) -> AsyncIterator[Any]:
+        """
+        Fetches a query as several disjoint partitions concurrently and yields the records.
+
+        partition_by="skip" stripes $skip windows over the partitions, window n going to partition n % partitions.
+        partition_by="id" splits the Id span into ranges and pages through each range with an extra $filter,
+        ordering by Id unless `orderby` is given.
+
+        At most `concurrency` (default `partitions`) requests are in flight.
+        With ordered=True every partition buffers at most one page ahead and records come back in the same order
+        as a single paged query, except for partition_by="id" with an `orderby` other than Id,
+        where they come back range by range in Id order, each range sorted by `orderby`.
+        With ordered=False pages are yielded as they arrive.
+        Partitions never overlap as long as `orderby` gives the records a stable order.
+
+        Raises:
+            RequestError and subtypes
+            GeneralError and subtypes
+            QueryError and subtypes
+        """
+        semaphore = asyncio.Semaphore(concurrency or partitions)
+        if partition_by == "id":
+            ranges = await self._query_id_ranges(module, entity, language, filter, partitions)
+            sources = [
+                self._query_pages(semaphore, module, entity, language, self._create_id_range_filter(filter, lower, upper), select, expand, orderby or "Id", page_size, 0, 1, result_format)
+                for lower, upper in ranges
+            ]
+        else:
+            sources = [
+                self._query_pages(semaphore, module, entity, language, filter, select, expand, orderby, page_size, index, partitions, result_format)
+                for index in range(partitions)
+            ]
+        if ordered:
+            queues = [asyncio.Queue[Any](maxsize=1) for _ in sources]
+        else:
+            queues = [asyncio.Queue[Any](maxsize=len(sources))] * len(sources)
+        tasks = [asyncio.create_task(self._pump_pages(pages, queue)) for pages, queue in zip(sources, queues)]
+        try:
+            if not ordered:
+                remaining = len(tasks)
+                while remaining:
+                    item = await queues[0].get()
+                    if item is _DONE:
+                        remaining -= 1
+                        continue
+                    if isinstance(item, BaseException):
+                        raise item
+                    for record in item:
+                        yield record
+            elif partition_by == "id":
+                for queue in queues:
+                    while (item := await queue.get()) is not _DONE:
+                        if isinstance(item, BaseException):
+                            raise item
+                        for record in item:
+                            yield record
+            else:
+                for window in itertools.count():
+                    item = await queues[window % len(queues)].get()
+                    if item is _DONE:
+                        return
+                    if isinstance(item, BaseException):
+                        raise item
+                    for record in item:
+                        yield record
+                    if len(item) < page_size:
+                        return
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _query_id_ranges(self, module: str, entity: str, language: str | None, filter: Expression | str | None, partitions: int) -> list[tuple[int, int]]:
+        first = await self.query(module, entity, language=language, filter=filter, select="Id", orderby="Id", top=1)
+        last = await self.query(module, entity, language=language, filter=filter, select="Id", orderby="Id desc", top=1)
+        if not first or not last:
+            return []
+        lowest, highest = first[0]["Id"], last[0]["Id"]
+        step = max(math.ceil((highest - lowest + 1) / partitions), 1)
+        return [(lower, lower + step) for lower in range(lowest, highest + 1, step)]
+
+    async def _query_pages(self,
+        semaphore: asyncio.Semaphore,
+        module: str,
+        entity: str,
+        language: str | None,
+        filter: Expression | str | None,
+        select: str | None,
+        expand: str | None,
+        orderby: str | None,
+        page_size: int,
+        offset: int,
+        stride: int,
+        result_format: Literal["dicts", "records"],
+    ) -> AsyncIterator[Any]:
+        """
+        Yields the pages offset, offset + stride, offset + 2 * stride, ... until a short page is returned.
+        """
+        for window in itertools.count(offset, stride):
+            async with semaphore:
+                page = await self.query(module, entity, None, language, filter, select, expand, orderby, page_size, window * page_size, result_format)
+            yield page
+            if len(page) < page_size:
+                return
+
+    @staticmethod
+    async def _pump_pages(pages: AsyncIterator[Any], queue: asyncio.Queue[Any]) -> None:
+        try:
+            async for page in pages:
+                await queue.put(page)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_DONE)
 
     async def command(self,
         module: str,
@@ -79,11 +565,26 @@ class AsyncClient(BaseClient):
         simulate: bool = False,
         validate: bool = False,
         language: str | None = None,
-        body: Any | None = None
+        body: Any | None = None,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
     ) -> Any:
+        if many and chunk_size is not None and body is not None and len(body) > chunk_size:
+            chunks = split_many(body, chunk_size)
+            semaphore = asyncio.Semaphore(concurrency)
+            results = await asyncio.gather(
+                *(self._with_semaphore(semaphore, self.command(module, namespace, command, many, simulate, validate, language, chunk)) for _, chunk in chunks),
+                return_exceptions=True,
+            )
+            return merge_many_responses(chunks, results)
         request = self._create_command_request(module, namespace, command, body, many, simulate, validate, language)
-        response = await self._make_api_request(request)
-        return self._handle_command_response(response)
+        invalidated_paths = [] if simulate or validate else [f"{module}/{namespace}"]
+        return await self._retry(partial(self._send_command, request, self._handle_command_response, invalidated_paths), idempotent=False)
+
+    @staticmethod
+    async def _with_semaphore(semaphore: asyncio.Semaphore, awaitable: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await awaitable
 
     async def batch(self,
         commands: list[BatchCommandEntity],
@@ -91,7 +592,18 @@ class AsyncClient(BaseClient):
         validate: bool = False,
         language: str | None = None,
         raise_on_error: bool = False,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
     ) -> Any:
+        if chunk_size is not None and len(commands) > chunk_size:
+            chunks = split_batch(commands, chunk_size)
+            semaphore = asyncio.Semaphore(concurrency)
+            results = await asyncio.gather(
+                *(self._with_semaphore(semaphore, self.batch(chunk, simulate, validate, language)) for _, chunk in chunks),
+                return_exceptions=True,
+            )
+            return merge_batch_responses(chunks, results, raise_on_error)
         request = self._create_batch_request(commands, simulate, validate, language)
-        response = await self._make_api_request(request)
-        return self._handle_batch_command_response(response, raise_on_error)
\ No newline at end of file
+        invalidated_paths = [] if simulate or validate else [command["Path"] for command in commands]
+        handler = partial(self._handle_batch_command_response, raise_on_error=raise_on_error)
+        return await self._retry(partial(self._send_command, request, handler, invalidated_paths), idempotent=False)
\ No newline at end of file
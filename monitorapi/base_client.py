@@ -1,13 +1,59 @@
 import httpx
+import json
 import logging
+import re
 from abc import ABC, abstractmethod
-from typing import Any, TypedDict
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, AsyncIterator, Literal, TypedDict
 from .import exceptions as exc
+from .cache import QueryCache
+from .chunking import pack_id_filters
+from .columnar import ResultFormat, parse_select
+from .filters import Expression
+from .metrics import Metrics
+from .retry import RetryPolicy
+from .session_store import DEFAULT_SESSION_STORE, SessionStore
+
+if TYPE_CHECKING:
+    from .prepared import PreparedCommand, PreparedQuery
 
 
 logger = logging.getLogger(__name__)
 
 X_MONITOR_SESSION_ID_HEADER = "x-monitor-sessionid"
+NO_SESSION_ID = "no-session-id-provided"
+
+# Same as the httpx defaults
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0)
+
+_PASSWORD_PATTERN = re.compile(rb'("Password"\s*:\s*)"(?:[^"\\]|\\.)*"')
+
+def _redact_headers(headers: httpx.Headers) -> list[tuple[str, str]]:
+    return [(name, "***" if name.lower() == X_MONITOR_SESSION_ID_HEADER else value) for name, value in headers.items()]
+
+def _format_body(content: bytes | None, limit: int) -> str:
+    if content is None:
+        return "<streamed>"
+    size = len(content)
+    if b'"Password"' in content:
+        content = _PASSWORD_PATTERN.sub(rb'\1"***"', content)
+    if size > limit:
+        return f"{content[:limit]!r}... ({size} bytes)"
+    return repr(content)
+
+def _read_content(response: httpx.Response | None) -> bytes | None:
+    if response is None:
+        return b""
+    try:
+        return response.content
+    except httpx.ResponseNotRead:
+        return None
+
+def _elapsed_ms(response: httpx.Response | None) -> int | None:
+    try:
+        return round(response.elapsed.total_seconds() * 1000) if response is not None else None
+    except RuntimeError:
+        # Streamed responses have no elapsed time until they are closed
+        return None
 
 class BatchCommandEntity(TypedDict):
     Path: str
@@ -25,7 +71,14 @@ class BaseClient(ABC):
         language_code: str = "en",
         api_version: str = "v1",
         x_monitor_session_id: str | None = None,
-        timeout: int = 10
+        timeout: int = 10,
+        cache: QueryCache | None = None,
+        coalesce_queries: bool = False,
+        retry: RetryPolicy | None = None,
+        log_body_limit: int = 1000,
+        trace_hook: Callable[[httpx.Request, httpx.Response | None], None] | None = None,
+        metrics: Metrics | None = None,
+        session_store: SessionStore | None = None,
         ) -> None:
         self.company_number = company_number
         self.username = username
@@ -34,27 +87,71 @@ class BaseClient(ABC):
 
         self.language_code = language_code
         self.api_version = api_version
-        self.x_monitor_session_id = x_monitor_session_id if x_monitor_session_id else "no-session-id-provided"
+        # Clients with the same credentials share their session through the store instead of each logging in
+        self.session_store = session_store if session_store is not None else DEFAULT_SESSION_STORE
+        self.x_monitor_session_id = x_monitor_session_id or self.session_store.get(self.session_key) or NO_SESSION_ID
 
         self.timeout = timeout
+        self.cache = cache
+        self.coalesce_queries = coalesce_queries
+        self.retry = retry
+        self.log_body_limit = log_body_limit
+        self.trace_hook = trace_hook
+        self.metrics = metrics
 
-    @staticmethod
-    def _log_request_response(request: httpx.Request, response: httpx.Response | None = None) -> None:
-        if response and response.is_error:
+    @property
+    def session_key(self) -> str:
+        return f"{self.base_url}|{self.company_number}|{self.username}"
+
+    def _adopt_stored_session(self, rejected_session_id: str | None) -> bool:
+        """
+        Takes over a session id another client stored since `rejected_session_id` was rejected.
+        Must be called holding the store's lock for session_key.
+        """
+        if rejected_session_id is None:
+            return False
+        stored = self.session_store.get(self.session_key)
+        if stored is None or stored == rejected_session_id:
+            return False
+        self.x_monitor_session_id = stored
+        logger.debug("Using session id refreshed by another client")
+        return True
+
+    def _log_request_response(self, request: httpx.Request, response: httpx.Response | None = None) -> None:
+        """
+        Logs one summary line per request, at INFO on success, WARNING on error responses and ERROR without response.
+        Headers and bodies are added at DEBUG level, or for failed requests, truncated to `log_body_limit` characters
+        with session ids and passwords redacted. Nothing is formatted unless the level is enabled.
+        """
+        if self.trace_hook is not None:
+            self.trace_hook(request, response)
+        if response is not None and response.is_error:
             level = logging.WARNING
-        elif response:
+        elif response is not None:
             level = logging.INFO
         else:
             level = logging.ERROR
-        logger.log(level, "Request:")
-        logger.log(level, f"URL: {request.url}")
-        logger.log(level, f"Headers: {request.headers.items()}")
-        logger.log(level, f"Body: {request.content!r}")
-        if response:
-            logger.log(level, "Response:")
-            logger.log(level, f"Status: {response.status_code}")
-            logger.log(level, f"Headers: {response.headers.items()}")
-            logger.log(level, f"Body: {response.content!r}")
+        if not logger.isEnabledFor(level):
+            return
+        status = response.status_code if response is not None else None
+        elapsed = _elapsed_ms(response)
+        extra = {"http_method": request.method, "http_url": str(request.url), "http_status": status, "elapsed_ms": elapsed}
+        if level == logging.INFO and not logger.isEnabledFor(logging.DEBUG):
+            logger.log(level, "%s %s -> %s elapsed_ms=%s", request.method, request.url, status, elapsed, extra=extra)
+            return
+        logger.log(
+            level,
+            "%s %s -> %s elapsed_ms=%s\nRequest headers: %s\nRequest body: %s\nResponse headers: %s\nResponse body: %s",
+            request.method,
+            request.url,
+            status,
+            elapsed,
+            _redact_headers(request.headers),
+            _format_body(request.content, self.log_body_limit),
+            _redact_headers(response.headers) if response is not None else None,
+            _format_body(_read_content(response), self.log_body_limit),
+            extra=extra,
+        )
 
     def _create_login_request(self) -> httpx.Request:
         request = httpx.Request(
@@ -76,7 +173,8 @@ class BaseClient(ABC):
                 raise exc.SessionSuspended(response.text)
             else:
                 self.x_monitor_session_id = response.headers.get(X_MONITOR_SESSION_ID_HEADER)
-                logger.debug(f"Refreshed session id: '{self.x_monitor_session_id}'")
+                self.session_store.set(self.session_key, self.x_monitor_session_id)
+                logger.debug("Refreshed session id")
                 return None
         else:
             logger.warning(f"Login failed with status '{response.status_code}'")
@@ -90,6 +188,7 @@ class BaseClient(ABC):
     def login(self) -> None:
         """
         Calls login endpoint and updates the X-Monitor-SessionId.
+        The new session id is written to the session store, where other clients with the same credentials pick it up.
 
         Raises:
             RequestError and subtypes.
@@ -123,7 +222,7 @@ class BaseClient(ABC):
         entity: str,
         id: int | None = None,
         language: str | None  = None,
-        filter: str  | None = None,
+        filter: Expression | str | None = None,
         select: str | None = None,
         expand: str | None = None,
         orderby: str | None = None,
@@ -140,7 +239,7 @@ class BaseClient(ABC):
 
         params: dict[str, str] = {}
         if filter is not None:
-            params["$filter"] = filter
+            params["$filter"] = str(filter)
         if select is not None:
             params["$select"] = select
         if expand is not None:
@@ -168,17 +267,26 @@ class BaseClient(ABC):
         entity: str,
         id: int | None = None,
         language: str | None  = None,
-        filter: str  | None = None,
+        filter: Expression | str | None = None,
         select: str | None = None,
         expand: str | None = None,
         orderby: str | None = None,
         top: int | None = None,
-        skip: int | None = None
+        skip: int | None = None,
+        result_format: ResultFormat = "dicts",
     ) -> Any:
         """
         Calls MonitorERP API query interface.
         Queries are sent to the API using HTTP GET requests with query parameters that manipulate the way data is fetched and returned.
         They bypass the business domain providing very fast read access of the persistent data of the MonitorERP system.
+
+        With coalesce_queries enabled, identical queries that are already in flight share that request
+        and all callers get the same decoded result object or exception. Every caller waits at most until its own deadline,
+        and if the request runs out of the deadline of the caller that sent it, the others send it again.
+        With a RetryPolicy failed queries are retried and slow queries can be hedged.
+
+        result_format turns a list of records into "records" (objects with __slots__), "columns" (one list per field)
+        or "numpy" (a structured array, needs NumPy). Fields are taken from `select` in its order.
         
         Raises:
             RequestError and subtypes
@@ -186,6 +294,199 @@ class BaseClient(ABC):
             QueryError and subtypes
         """
     
+    @abstractmethod
+    def prepare_query(self,
+        module: str,
+        entity: str,
+        language: str | None = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        result_format: ResultFormat = "dicts",
+    ) -> Any:
+        """
+        Returns a PreparedQuery with the URL and constant parameters encoded once, for running the same query many times.
+        The filter can be a filters.Expression with Params whose values are passed on each call.
+        Prepared queries are cached, coalesced and retried like query.
+        """
+
+    @abstractmethod
+    def prepare_command(self,
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+    ) -> Any:
+        """
+        Returns a PreparedCommand with the URL built once, called with the body of each command.
+        """
+
+    @abstractmethod
+    def _query_prepared(self, prepared: "PreparedQuery", request: httpx.Request) -> Any:
+        """
+        Sends the request built by a PreparedQuery, awaitable on an AsyncClient.
+        """
+
+    @abstractmethod
+    def _command_prepared(self, prepared: "PreparedCommand", request: httpx.Request) -> Any:
+        """
+        Sends the request built by a PreparedCommand, awaitable on an AsyncClient.
+        """
+
+    @abstractmethod
+    def query_stream(self,
+        module: str,
+        entity: str,
+        id: int | None = None,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        top: int | None = None,
+        skip: int | None = None
+    ) -> Iterator[Any] | AsyncIterator[Any]:
+        """
+        Like query, but streams the response and yields the records while the body is still being received.
+        Neither the raw body nor the full list of records is ever held in memory.
+        Streamed queries are not cached, coalesced or retried.
+
+        Raises:
+            RequestError and subtypes
+            GeneralError and subtypes
+            QueryError and subtypes
+        """
+
+    @abstractmethod
+    def query_iter(self,
+        module: str,
+        entity: str,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        skip: int = 0,
+        page_size: int = 500,
+        prefetch: int = 1,
+        result_format: Literal["dicts", "records"] = "dicts",
+    ) -> Iterator[Any] | AsyncIterator[Any]:
+        """
+        Pages through a query using $top/$skip and yields records one at a time.
+        While the current page is consumed, the next `prefetch` pages are already being fetched,
+        so at most `prefetch + 1` pages are held in memory.
+        Paging is only stable if `orderby` gives the records a stable order.
+        With result_format="records" the records are yielded as objects with __slots__ for the `select` fields.
+        To collect a paged query into columns, feed it to columnar.ColumnBuilder.
+
+        Raises:
+            RequestError and subtypes
+            GeneralError and subtypes
+            QueryError and subtypes
+        """
+
+    @abstractmethod
+    def query_many(self,
+        module: str,
+        entity: str,
+        ids: Iterable[int],
+        language: str | None = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        max_url_length: int = 2000,
+        concurrency: int = 4,
+    ) -> Any:
+        """
+        Fetches the records with the given ids in as few queries as fit into URLs of `max_url_length` characters,
+        up to `concurrency` of them at once, and returns them by id. Ids without a record are left out.
+        Id is added to `select` if missing.
+
+        Raises:
+            RequestError and subtypes
+            GeneralError and subtypes
+            QueryError and subtypes
+        """
+
+    @abstractmethod
+    def join(self,
+        records: Iterable[dict[str, Any]],
+        key: str,
+        module: str,
+        entity: str,
+        into: str | None = None,
+        language: str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        max_url_length: int = 2000,
+        concurrency: int = 4,
+    ) -> Any:
+        """
+        Resolves the foreign key `key` of every record against `module`/`entity` with one query_many
+        and returns copies of the records with the related record, or None, under `into` (default: entity).
+        """
+
+    def _create_id_filters(self,
+        module: str,
+        entity: str,
+        ids: Iterable[int],
+        language: str | None,
+        filter: Expression | str | None,
+        select: str | None,
+        expand: str | None,
+        max_url_length: int,
+    ) -> tuple[list[str], str | None]:
+        """
+        Returns the filters selecting the distinct ids in chunks that keep every URL within max_url_length,
+        and the select with Id added.
+        """
+        if select is not None and "Id" not in parse_select(select):
+            select = f"Id,{select}"
+        empty = f"({filter}) and ()" if filter else ""
+        base_length = len(str(self._create_query_request(module, entity, None, language, empty, select, expand).url))
+        id_filters = pack_id_filters(list(dict.fromkeys(ids)), max_url_length - base_length)
+        if filter:
+            id_filters = [f"({filter}) and ({id_filter})" for id_filter in id_filters]
+        return id_filters, select
+
+    @staticmethod
+    def _join_records(records: Iterable[dict[str, Any]], key: str, into: str, index: dict[int, Any]) -> list[dict[str, Any]]:
+        return [{**record, into: index.get(record.get(key))} for record in records]  # type: ignore[arg-type]
+
+    @staticmethod
+    def _create_id_range_filter(filter: Expression | str | None, lower: int, upper: int) -> str:
+        """
+        Restricts a $filter to records with lower <= Id < upper.
+        """
+        id_range = f"Id ge {lower} and Id lt {upper}"
+        if filter:
+            return f"({filter}) and {id_range}"
+        return id_range
+
+    def _get_cached_query(self, request: httpx.Request) -> Any | None:
+        """
+        Returns the decoded cached response of the query request, or None on a cache miss.
+        """
+        if self.cache is None:
+            return None
+        value = self.cache.get(request)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def _set_cached_query(self, request: httpx.Request, response: httpx.Response, module: str, entity: str) -> None:
+        if self.cache is not None and response.is_success:
+            self.cache.set(request, module, entity, response.content)
+
+    def _invalidate_cache(self, *paths: str) -> None:
+        if self.cache is not None:
+            for path in paths:
+                self.cache.invalidate(path)
+
     def _handle_query_response(self, response: httpx.Response) -> Any:
         if response.is_success:
             return response.json()
@@ -242,13 +543,19 @@ class BaseClient(ABC):
         simulate: bool = False,
         validate: bool = False,
         language: str | None = None,
-        body: Any | None = None
+        body: Any | None = None,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
     ) -> Any:
         """
         Calls MonitorERP API command interface.
         Commands are sent to the API using HTTP POST requests.
         Commands interact with the business domain of the MonitorERP system.
 
+        With many=True and chunk_size set, a longer body is sent as several /Many commands of at most chunk_size items,
+        up to `concurrency` at once, and their results are returned in the order of `body`.
+        If chunks fail, ChunkedCommandError reports the exception of each of them, the other chunks were executed.
+
         Raises:
             RequestError and subtypes
             GeneralError and subtypes
@@ -307,7 +614,23 @@ class BaseClient(ABC):
         validate: bool = False,
         language: str | None = None,
         raise_on_error: bool = False,
-    ) -> Any: pass
+        chunk_size: int | None = None,
+        concurrency: int = 4,
+    ) -> Any:
+        """
+        Calls MonitorERP API batch interface, executing the commands in one transaction.
+
+        With chunk_size set, a longer list is split into batches of at most chunk_size commands,
+        keeping commands linked by ForwardPropertyName/ReceivingPropertyName together,
+        and up to `concurrency` of them are sent at once. Every chunk is its own transaction.
+        The responses are merged into one batch response indexed like `commands`,
+        see chunking.merge_batch_responses.
+
+        Raises:
+            RequestError and subtypes
+            GeneralError and subtypes
+            CommandError and subtypes
+        """
     
     def _handle_batch_command_response(self, response: httpx.Response, raise_on_error: bool) -> Any:
         if response.is_success:
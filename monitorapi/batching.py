@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Sequence
+
+from .async_client import AsyncClient
+from .base_client import BatchCommandEntity
+from .sync_client import SyncClient
+from .import exceptions as exc
+
+
+logger = logging.getLogger(__name__)
+
+_Entry = tuple[BatchCommandEntity, "Future[Any] | asyncio.Future[Any]"]
+
+def _create_batch_entity(module: str, namespace: str, command: str, body: Any | None) -> BatchCommandEntity:
+    return {
+        "Path": f"{module}/{namespace}/{command}",
+        "Body": body,
+        "ForwardPropertyName": None,
+        "ReceivingPropertyName": None,
+    }
+
+def _settle_batch(entries: Sequence[_Entry], batch_response: Any) -> list[_Entry]:
+    """
+    Hands every caller its own entry of the batch response.
+    A failed batch is rolled back as a whole, so only the entry at FailingIndex gets the error
+    and the remaining entries are returned to be sent again.
+    """
+    if batch_response.get("IsSuccessful", True):
+        responses = batch_response.get("Responses") or []
+        for index, (_, future) in enumerate(entries):
+            if not future.done():
+                future.set_result(responses[index] if index < len(responses) else None)
+        return []
+
+    error_message = batch_response.get("ErrorMessage")
+    failing_index = batch_response.get("FailingIndex")
+    if failing_index is None or not 0 <= failing_index < len(entries):
+        for _, future in entries:
+            if not future.done():
+                future.set_exception(exc.BatchCommandError(error_message))
+        return []
+    if not entries[failing_index][1].done():
+        entries[failing_index][1].set_exception(exc.BatchCommandError(error_message))
+    logger.debug("Batch failed at index %s, resending %s commands", failing_index, len(entries) - 1)
+    return [entry for index, entry in enumerate(entries) if index != failing_index]
+
+
+class SyncBatchingClient:
+    """
+    Wraps a SyncClient and collects command() calls from any number of threads into /Batch requests.
+    A batch is sent once `max_batch_size` commands are collected or `max_delay` seconds after its first command.
+
+    Only plain commands are batched, calls using many, simulate, validate or a language are sent directly.
+    Every other attribute is taken from the wrapped client.
+    """
+
+    def __init__(self, client: SyncClient, max_batch_size: int = 100, max_delay: float = 0.05) -> None:
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending: list[_Entry] = []
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def __enter__(self) -> "SyncBatchingClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.flush()
+
+    def submit(self, module: str, namespace: str, command: str, body: Any | None = None) -> "Future[Any]":
+        """
+        Queues a command and returns a future resolving to its entry of the batch response.
+        """
+        future: Future[Any] = Future()
+        entries = None
+        with self._lock:
+            self._pending.append((_create_batch_entity(module, namespace, command, body), future))
+            if len(self._pending) >= self.max_batch_size:
+                entries = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if entries:
+            self._send(entries)
+        return future
+
+    def command(self,
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+        body: Any | None = None
+    ) -> Any:
+        if many or simulate or validate or language:
+            return self.client.command(module, namespace, command, many, simulate, validate, language, body)
+        return self.submit(module, namespace, command, body).result()
+
+    def flush(self) -> None:
+        """
+        Sends all queued commands now.
+        """
+        with self._lock:
+            entries = self._take_pending()
+        if entries:
+            self._send(entries)
+
+    def _take_pending(self) -> list[_Entry]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        entries, self._pending = self._pending, []
+        return entries
+
+    def _send(self, entries: list[_Entry]) -> None:
+        while entries:
+            try:
+                batch_response = self.client.batch([entity for entity, _ in entries])
+            except Exception as e:
+                for _, future in entries:
+                    future.set_exception(e)
+                return
+            entries = _settle_batch(entries, batch_response)
+
+
+class AsyncBatchingClient:
+    """
+    Wraps an AsyncClient and collects command() calls from concurrent tasks into /Batch requests.
+    A batch is sent once `max_batch_size` commands are collected or `max_delay` seconds after its first command.
+
+    Only plain commands are batched, calls using many, simulate, validate or a language are sent directly.
+    Every other attribute is taken from the wrapped client.
+    """
+
+    def __init__(self, client: AsyncClient, max_batch_size: int = 100, max_delay: float = 0.05) -> None:
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending: list[_Entry] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    async def __aenter__(self) -> "AsyncBatchingClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.flush()
+
+    def submit(self, module: str, namespace: str, command: str, body: Any | None = None) -> "asyncio.Future[Any]":
+        """
+        Queues a command and returns a future resolving to its entry of the batch response.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((_create_batch_entity(module, namespace, command, body), future))
+        if len(self._pending) >= self.max_batch_size:
+            self._send_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._send_pending)
+        return future
+
+    async def command(self,
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+        body: Any | None = None
+    ) -> Any:
+        if many or simulate or validate or language:
+            return await self.client.command(module, namespace, command, many, simulate, validate, language, body)
+        return await self.submit(module, namespace, command, body)
+
+    async def flush(self) -> None:
+        """
+        Sends all queued commands and waits for every batch in flight.
+        """
+        self._send_pending()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _send_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        entries, self._pending = self._pending, []
+        if entries:
+            task = asyncio.create_task(self._send(entries))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, entries: list[_Entry]) -> None:
+        while entries:
+            try:
+                batch_response = await self.client.batch([entity for entity, _ in entries])
+            except Exception as e:
+                for _, future in entries:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            entries = _settle_batch(entries, batch_response)
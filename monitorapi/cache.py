@@ -0,0 +1,235 @@
+import httpx
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal
+
+
+def request_key(request: httpx.Request) -> str:
+    """
+    Normalized URL of a query request with its parameters sorted, used to identify identical queries.
+    """
+    params = sorted(request.url.params.multi_items())
+    return str(request.url.copy_with(params=params))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+    entries: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CacheBackend(ABC):
+    """
+    Storage for cached query response bodies.
+    Every entry is tagged with the module and entity it was read from so commands can invalidate it.
+    """
+
+    evictions: int = 0
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None: pass
+
+    @abstractmethod
+    def set(self, key: str, module: str, entity: str, value: bytes, ttl: float) -> None: pass
+
+    @abstractmethod
+    def invalidate(self, module: str, entity: str | None = None) -> int:
+        """
+        Removes all entries of the module, or only of the module's entity if given.
+        Returns the number of removed entries.
+        """
+
+    @abstractmethod
+    def clear(self) -> None: pass
+
+    @abstractmethod
+    def __len__(self) -> int: pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU cache bounded by number of entries and total size of the stored bodies.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int | None = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._size = 0
+        self._entries: OrderedDict[str, tuple[float, str, str, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, _, _, value = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, module: str, entity: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, module, entity, value)
+            self._size += len(value)
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._size > self.max_bytes)
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, module: str, entity: str | None = None) -> int:
+        with self._lock:
+            keys = [
+                key for key, (_, _module, _entity, _) in self._entries.items()
+                if _module == module and (entity is None or _entity == entity)
+            ]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        _, _, _, value = self._entries.pop(key)
+        self._size -= len(value)
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    LRU cache stored in a SQLite file so several worker processes on the same host can share it.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache ("
+            "key TEXT PRIMARY KEY, module TEXT, entity TEXT, value BLOB, expires REAL, accessed REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS query_cache_path ON query_cache (module, entity)")
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM query_cache WHERE key = ? AND expires >= ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE query_cache SET accessed = ? WHERE key = ?", (now, key))
+            return bytes(row[0])
+
+    def set(self, key: str, module: str, entity: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, module, entity, value, now + ttl, now),
+            )
+            self._connection.execute("DELETE FROM query_cache WHERE expires < ?", (now,))
+            overflow = self._connection.execute(
+                "DELETE FROM query_cache WHERE key IN "
+                "(SELECT key FROM query_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self.evictions += max(overflow, 0)
+
+    def invalidate(self, module: str, entity: str | None = None) -> int:
+        with self._lock:
+            if entity is None:
+                cursor = self._connection.execute("DELETE FROM query_cache WHERE module = ?", (module,))
+            else:
+                cursor = self._connection.execute(
+                    "DELETE FROM query_cache WHERE module = ? AND entity = ?", (module, entity)
+                )
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM query_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+
+
+class QueryCache:
+    """
+    Opt-in cache of successful query responses, keyed on the normalized query URL and parameters.
+
+    Commands and batches invalidate the cached queries of the paths they touch.
+    With scope="module" a command on Inventory/Parts drops every cached Inventory query,
+    with scope="entity" only the cached Inventory/Parts queries.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None, ttl: float = 300, scope: Literal["module", "entity"] = "module") -> None:
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.scope = scope
+        self._stats = CacheStats()
+        # SyncClient uses the cache from its worker threads
+        self._lock = threading.Lock()
+
+    def get(self, request: httpx.Request) -> bytes | None:
+        value = self.backend.get(request_key(request))
+        with self._lock:
+            if value is None:
+                self._stats.misses += 1
+            else:
+                self._stats.hits += 1
+        return value
+
+    def set(self, request: httpx.Request, module: str, entity: str, value: bytes) -> None:
+        self.backend.set(request_key(request), module, entity, value, self.ttl)
+
+    def invalidate(self, path: str) -> None:
+        """
+        Invalidates cached queries touched by a command path like 'Inventory/Parts/Create'.
+        """
+        module, _, rest = path.strip("/").partition("/")
+        entity = rest.partition("/")[0] if self.scope == "entity" else None
+        invalidated = self.backend.invalidate(module, entity)
+        with self._lock:
+            self._stats.invalidations += invalidated
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            hits, misses, invalidations = self._stats.hits, self._stats.misses, self._stats.invalidations
+        return CacheStats(
+            hits=hits,
+            misses=misses,
+            invalidations=invalidations,
+            evictions=self.backend.evictions,
+            entries=len(self.backend),
+        )
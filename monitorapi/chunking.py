@@ -0,0 +1,136 @@
+from typing import TYPE_CHECKING, Any, Sequence
+
+from .import exceptions as exc
+
+if TYPE_CHECKING:
+    from .base_client import BatchCommandEntity
+
+
+BatchChunk = tuple[int, list["BatchCommandEntity"]]
+ManyChunk = tuple[int, list[Any]]
+
+def split_many(body: Sequence[Any], chunk_size: int) -> list[ManyChunk]:
+    """
+    Splits the body of a /Many command into chunks of at most `chunk_size` items, returned with the offset of their first item.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    return [(offset, list(body[offset:offset + chunk_size])) for offset in range(0, len(body), chunk_size)]
+
+def pack_id_filters(ids: Sequence[int], budget: int) -> list[str]:
+    """
+    Packs ids into as few filters like 'Id eq 1 or Id eq 2' as possible, each at most `budget` characters long once URL encoded.
+    An id that does not fit on its own still gets a filter.
+    """
+    filters: list[str] = []
+    clauses: list[str] = []
+    length = 0
+    for id in ids:
+        clause = f"Id eq {id}"
+        added = len(clause) + (4 if clauses else 0)
+        if clauses and length + added > budget:
+            filters.append(" or ".join(clauses))
+            clauses, length, added = [], 0, len(clause)
+        clauses.append(clause)
+        length += added
+    if clauses:
+        filters.append(" or ".join(clauses))
+    return filters
+
+def merge_many_responses(chunks: Sequence[ManyChunk], results: Sequence[Any]) -> list[Any]:
+    """
+    Concatenates the per-item results of chunked /Many commands in the order of the original body.
+    Chunks without a response body contribute None per item.
+    A chunk whose response is not a list with one result per item fails with a CommandError,
+    since its results cannot be matched to its items.
+
+    Raises:
+        ChunkedCommandError if a chunk raised or failed, with the merged results as `result`, None for the items of failed chunks.
+    """
+    merged: list[Any] = []
+    exceptions: dict[int, BaseException] = {}
+    for (offset, chunk), result in zip(chunks, results):
+        if result is None:
+            merged.extend([None] * len(chunk))
+            continue
+        if not isinstance(result, BaseException) and not (isinstance(result, list) and len(result) == len(chunk)):
+            got = f"{len(result)} results" if isinstance(result, list) else f"a {type(result).__name__}"
+            result = exc.CommandError(f"Expected {len(chunk)} results, got {got}")
+        if isinstance(result, BaseException):
+            exceptions[offset] = result
+            merged.extend([None] * len(chunk))
+        else:
+            merged.extend(result)
+    if exceptions:
+        failed = ", ".join(f"items {offset}-{offset + len(chunk) - 1}: {exceptions[offset]!r}" for offset, chunk in chunks if offset in exceptions)
+        raise exc.ChunkedCommandError(f"{len(exceptions)} of {len(chunks)} chunks failed ({failed})", merged, exceptions)
+    return merged
+
+def split_batch(commands: Sequence["BatchCommandEntity"], chunk_size: int) -> list[BatchChunk]:
+    """
+    Splits batch commands into chunks of at most `chunk_size` commands, returned with the offset of their first command.
+    A command forwarding a property and the command receiving it are kept in one chunk,
+    so a chain longer than `chunk_size` becomes a chunk of its own.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    chains: list[tuple[int, int]] = []
+    for index, command in enumerate(commands):
+        linked = index > 0 and (commands[index - 1].get("ForwardPropertyName") or command.get("ReceivingPropertyName"))
+        if linked:
+            chains[-1] = (chains[-1][0], index + 1)
+        else:
+            chains.append((index, index + 1))
+
+    chunks: list[BatchChunk] = []
+    start = end = 0
+    for chain_start, chain_end in chains:
+        if end > start and chain_end - start > chunk_size:
+            chunks.append((start, list(commands[start:end])))
+            start = chain_start
+        end = chain_end
+    if end > start:
+        chunks.append((start, list(commands[start:end])))
+    return chunks
+
+def merge_batch_responses(chunks: Sequence[BatchChunk], results: Sequence[Any], raise_on_error: bool) -> dict[str, Any]:
+    """
+    Combines the responses of chunked batches into one batch response with indices of the original command list.
+    Chunks are separate transactions: a failed chunk is rolled back, the others stay committed.
+    Responses has one entry per command, None for the commands of failed chunks.
+    Errors has the FailingIndex and ErrorMessage of every failed chunk, the top level ones are those of the first.
+
+    Raises:
+        ChunkedCommandError if a chunk raised, with the merged response as `result`.
+        BatchCommandError if raise_on_error is set and a chunk failed.
+    """
+    responses: list[Any] = []
+    errors: list[dict[str, Any]] = []
+    exceptions: dict[int, BaseException] = {}
+    for (offset, chunk), result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            exceptions[offset] = result
+            responses.extend([None] * len(chunk))
+        elif not result.get("IsSuccessful", True):
+            failing_index = result.get("FailingIndex")
+            errors.append({
+                "FailingIndex": offset + failing_index if failing_index is not None else None,
+                "ErrorMessage": result.get("ErrorMessage"),
+            })
+            responses.extend([None] * len(chunk))
+        else:
+            chunk_responses = list(result.get("Responses") or [])
+            responses.extend((chunk_responses + [None] * len(chunk))[:len(chunk)])
+
+    merged = {
+        "IsSuccessful": not errors and not exceptions,
+        "ErrorMessage": errors[0]["ErrorMessage"] if errors else None,
+        "FailingIndex": errors[0]["FailingIndex"] if errors else None,
+        "Errors": errors,
+        "Responses": responses,
+    }
+    if exceptions:
+        raise exc.ChunkedCommandError(f"{len(exceptions)} of {len(chunks)} chunks failed", merged, exceptions)
+    if errors and raise_on_error:
+        raise exc.BatchCommandError(f"At index {merged['FailingIndex']}: {merged['ErrorMessage']}")
+    return merged
@@ -0,0 +1,126 @@
+import httpx
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Literal
+
+from .import exceptions as exc
+from .limiter import endpoint_class
+
+
+logger = logging.getLogger(__name__)
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+class _Circuit:
+
+    def __init__(self, window: int) -> None:
+        self.state: CircuitState = "closed"
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probes = 0
+
+
+class CircuitBreaker:
+    """
+    Fails requests fast with CircuitOpen while the server is failing, instead of letting every caller wait for a timeout.
+
+    Requests are grouped by `group`, by default into "query", "command" and "batch", and every group has its own circuit.
+    A circuit opens when at least `min_requests` of the last `window` requests completed and `failure_rate` of them failed
+    with a transport error, timeout or 429/5xx status. After `reset_timeout` seconds it lets `probes` requests through;
+    if they succeed the circuit closes again, if one fails it opens for another `reset_timeout`.
+    Share one breaker between clients talking to the same server to trip it on their combined traffic.
+    """
+
+    def __init__(self,
+        failure_rate: float = 0.5,
+        min_requests: int = 20,
+        window: int = 100,
+        reset_timeout: float = 10.0,
+        probes: int = 1,
+        group: Callable[[httpx.Request], str] = endpoint_class,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.group = group
+        self._circuits: dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, group: str) -> _Circuit:
+        circuit = self._circuits.get(group)
+        if circuit is None:
+            circuit = self._circuits[group] = _Circuit(self.window)
+        return circuit
+
+    def _open(self, group: str, circuit: _Circuit) -> None:
+        circuit.state = "open"
+        circuit.opened_at = time.monotonic()
+        circuit.probes = 0
+        logger.warning(f"Circuit {group} opened for {self.reset_timeout}s")
+
+    def acquire(self, request: httpx.Request) -> str:
+        """
+        Raises CircuitOpen if the request's circuit is open, otherwise returns its group for release().
+        """
+        group = self.group(request)
+        with self._lock:
+            circuit = self._circuit(group)
+            if circuit.state == "open":
+                if time.monotonic() - circuit.opened_at < self.reset_timeout:
+                    raise exc.CircuitOpen(f"Circuit {group} is open")
+                circuit.state = "half_open"
+                logger.info(f"Circuit {group} half-open, probing")
+            if circuit.state == "half_open":
+                if circuit.probes >= self.probes:
+                    raise exc.CircuitOpen(f"Circuit {group} is half-open and waiting for its probes")
+                circuit.probes += 1
+        return group
+
+    def cancel(self, group: str) -> None:
+        """
+        Gives back the probe slot of a request that was acquired but ended without an outcome,
+        because it was not sent, was cancelled or failed before the server answered.
+        """
+        with self._lock:
+            circuit = self._circuit(group)
+            if circuit.state == "half_open" and circuit.probes > 0:
+                circuit.probes -= 1
+
+    def release(self, group: str, failed: bool) -> None:
+        with self._lock:
+            circuit = self._circuit(group)
+            if circuit.state == "half_open":
+                if failed:
+                    self._open(group, circuit)
+                else:
+                    circuit.probes = max(circuit.probes - 1, 0)
+                    if circuit.probes == 0:
+                        circuit.state = "closed"
+                        circuit.outcomes.clear()
+                        logger.info(f"Circuit {group} closed")
+                return
+            if circuit.state == "open":
+                # A request sent before the circuit opened
+                return
+            circuit.outcomes.append(failed)
+            if len(circuit.outcomes) >= self.min_requests and sum(circuit.outcomes) >= self.failure_rate * len(circuit.outcomes):
+                self._open(group, circuit)
+
+    def state(self, group: str) -> CircuitState:
+        with self._lock:
+            return self._circuit(group).state
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                group: {
+                    "state": circuit.state,
+                    "requests": len(circuit.outcomes),
+                    "failures": sum(circuit.outcomes),
+                }
+                for group, circuit in self._circuits.items()
+            }
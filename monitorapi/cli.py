@@ -0,0 +1,65 @@
+import argparse
+import logging
+import os
+import sys
+
+from .export import export
+from .sync_client import SyncClient
+
+
+def _client(args: argparse.Namespace) -> SyncClient:
+    missing = [name for name in ("company_number", "username", "password", "base_url") if not getattr(args, name)]
+    if missing:
+        raise SystemExit(f"Missing {', '.join(missing)}, pass them as options or API_* environment variables")
+    return SyncClient(args.company_number, args.username, args.password, args.base_url, language_code=args.language_code, timeout=args.timeout)
+
+def _export(args: argparse.Namespace) -> None:
+    with _client(args) as client:
+        rows = export(
+            client,
+            args.module,
+            args.entity,
+            args.path,
+            format=args.format,
+            compress=True if args.gzip else None,
+            filter=args.filter,
+            select=args.select,
+            expand=args.expand,
+            orderby=args.orderby,
+            page_size=args.page_size,
+            prefetch=args.prefetch,
+        )
+    print(f"Exported {rows} records to {args.path}", file=sys.stderr)
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="monitorapi", description="Command line tools for the MonitorERP API.")
+    parser.add_argument("--company-number", default=os.environ.get("API_COMPANY_NUMBER"))
+    parser.add_argument("--username", default=os.environ.get("API_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("API_PASSWORD"))
+    parser.add_argument("--base-url", default=os.environ.get("API_BASE_URL"))
+    parser.add_argument("--language-code", default="en")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log requests")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Stream an entity into an NDJSON or CSV file, resuming an interrupted export")
+    export_parser.add_argument("module")
+    export_parser.add_argument("entity")
+    export_parser.add_argument("path", help="Output file, the format and gzip compression follow from .ndjson, .csv and .gz")
+    export_parser.add_argument("--format", choices=["ndjson", "csv"])
+    export_parser.add_argument("--gzip", action="store_true", help="Compress even if the file name does not end with .gz")
+    export_parser.add_argument("--filter")
+    export_parser.add_argument("--select")
+    export_parser.add_argument("--expand")
+    export_parser.add_argument("--orderby", default="Id")
+    export_parser.add_argument("--page-size", type=int, default=1000)
+    export_parser.add_argument("--prefetch", type=int, default=2)
+    export_parser.set_defaults(handler=_export)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
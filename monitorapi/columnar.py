@@ -0,0 +1,135 @@
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Literal
+
+
+ResultFormat = Literal["dicts", "records", "columns", "numpy"]
+
+def parse_select(select: str) -> list[str]:
+    """
+    Field names of a $select clause like 'Id,PartNumber'.
+    """
+    return [field.strip() for field in select.split(",") if field.strip()]
+
+
+class Record:
+    """
+    Base of the lightweight record types created by record_class.
+    Values are kept in __slots__ instead of a dict per row.
+    """
+
+    __slots__: tuple[str, ...] = ()
+    _fields: tuple[str, ...] = ()
+
+    def __init__(self, *values: Any) -> None:
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({values})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Record) or other.__slots__ != self.__slots__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def _asdict(self) -> dict[str, Any]:
+        return {field: getattr(self, name) for field, name in zip(self._fields, self.__slots__)}
+
+
+@lru_cache(maxsize=256)
+def record_class(fields: tuple[str, ...]) -> type[Record]:
+    """
+    Record type with one slot per field. Characters not allowed in attribute names are replaced by '_'.
+    """
+    names = tuple(re.sub(r"\W", "_", field) for field in fields)
+    return type("Record", (Record,), {"__slots__": names, "_fields": fields})
+
+
+class ColumnBuilder:
+    """
+    Collects records one at a time into one list per field, so paged or streamed queries
+    can be turned into columns without keeping the dicts of all rows.
+    Fields default to the keys of the first record.
+    """
+
+    def __init__(self, fields: Iterable[str] | str | None = None) -> None:
+        if isinstance(fields, str):
+            fields = parse_select(fields)
+        self.fields = list(fields) if fields is not None else None
+        self._columns: dict[str, list[Any]] = {field: [] for field in self.fields or []}
+
+    def append(self, record: dict[str, Any]) -> None:
+        if self.fields is None:
+            self.fields = list(record)
+            self._columns = {field: [] for field in self.fields}
+        for field, column in self._columns.items():
+            column.append(record.get(field))
+
+    def extend(self, records: Iterable[dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def columns(self) -> dict[str, list[Any]]:
+        return self._columns
+
+    def numpy(self) -> Any:
+        return to_structured_array(self._columns)
+
+
+def to_records(records: Iterable[dict[str, Any]], fields: list[str] | None = None) -> list[Record]:
+    records = list(records)
+    if not records:
+        return []
+    fields = fields or list(records[0])
+    cls = record_class(tuple(fields))
+    return [cls(*(record.get(field) for field in fields)) for record in records]
+
+def to_columns(records: Iterable[dict[str, Any]], fields: list[str] | None = None) -> dict[str, list[Any]]:
+    builder = ColumnBuilder(fields)
+    builder.extend(records)
+    return builder.columns()
+
+def _column_dtype(values: list[Any]) -> str:
+    types = {type(value) for value in values}
+    if types == {bool}:
+        return "?"
+    if types == {int}:
+        return "i8"
+    if types <= {int, float, type(None)} and float in types:
+        return "f8"
+    return "O"
+
+def to_structured_array(columns: dict[str, list[Any]]) -> Any:
+    """
+    NumPy structured array with one typed field per column. Columns with mixed types or None are kept as objects,
+    except float columns where None becomes NaN.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("The 'numpy' result format needs NumPy to be installed")
+    length = len(next(iter(columns.values()), []))
+    dtypes = {field: _column_dtype(values) for field, values in columns.items()}
+    array = np.empty(length, dtype=[(field, dtype) for field, dtype in dtypes.items()])
+    for field, values in columns.items():
+        if dtypes[field] == "f8":
+            values = [float("nan") if value is None else value for value in values]
+        array[field] = values
+    return array
+
+def convert(result: Any, select: str | None, result_format: ResultFormat) -> Any:
+    """
+    Converts a list of query records into the requested format, using the $select fields in their order.
+    Results that are not lists, like a query by id, are returned unchanged.
+    """
+    if result_format == "dicts" or not isinstance(result, list):
+        return result
+    fields = parse_select(select) if select else None
+    if result_format == "records":
+        return to_records(result, fields)
+    columns = to_columns(result, fields)
+    if result_format == "numpy":
+        return to_structured_array(columns)
+    return columns
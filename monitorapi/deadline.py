@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import httpx
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+from .import exceptions as exc
+
+
+T = TypeVar("T")
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("monitorapi_deadline", default=None)
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Bounds every client call made inside the block, on a SyncClient or AsyncClient, to `seconds` in total,
+    including waiting for a login, the login itself, the limiter, retries and their backoff.
+    Calls still running when the time is up raise DeadlineExceeded, calls made afterwards raise it right away.
+
+        with deadline(2.0):
+            part = client.query("Inventory", "Parts", id=1)
+
+    Nested deadlines can only shorten the enclosing one. The deadline follows the context into tasks,
+    and into the threads of SyncClient.gather, map and the other calls running on worker threads.
+    """
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> float | None:
+    """
+    Seconds left until the current deadline, None without a deadline.
+    """
+    at = _deadline.get()
+    return at - time.monotonic() if at is not None else None
+
+def check_deadline() -> float | None:
+    """
+    Returns the seconds left like remaining(), raising DeadlineExceeded if none are.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise exc.DeadlineExceeded("Deadline exceeded")
+    return left
+
+def bound_timeout(request: httpx.Request, timeout: httpx.Timeout) -> httpx.Request:
+    """
+    Shortens the timeouts of the request to what is left of the deadline.
+    """
+    left = check_deadline()
+    if left is not None:
+        request.extensions["timeout"] = {
+            name: left if value is None else min(value, left) for name, value in timeout.as_dict().items()
+        }
+    return request
+
+def bound_stream(response: httpx.Response) -> httpx.Response:
+    """
+    Makes reading the body of a streamed response raise DeadlineExceeded once the current deadline has passed,
+    also when the body is read after the deadline block was left.
+    """
+    at = _deadline.get()
+    if at is None:
+        return response
+    if isinstance(response.stream, httpx.AsyncByteStream):
+        response.stream = _AsyncDeadlineStream(response.stream, at)
+    elif isinstance(response.stream, httpx.SyncByteStream):
+        response.stream = _SyncDeadlineStream(response.stream, at)
+    return response
+
+
+class _SyncDeadlineStream(httpx.SyncByteStream):
+    """
+    The timeouts of httpx only limit every single read, so the deadline is checked between the reads.
+    """
+
+    def __init__(self, stream: httpx.SyncByteStream, at: float) -> None:
+        self._stream = stream
+        self._at = at
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._stream:
+            if time.monotonic() >= self._at:
+                raise exc.DeadlineExceeded("Deadline exceeded reading the response")
+            yield chunk
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _AsyncDeadlineStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream: httpx.AsyncByteStream, at: float) -> None:
+        self._stream = stream
+        self._at = at
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunks = self._stream.__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), self._at - time.monotonic())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise exc.DeadlineExceeded("Deadline exceeded reading the response")
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+def in_context(call: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wraps the call to run in a copy of the current context, so a deadline set by the caller also applies on a worker thread.
+    """
+    context = contextvars.copy_context()
+    def run(*args: Any, **kwargs: Any) -> T:
+        return context.copy().run(call, *args, **kwargs)
+    return run
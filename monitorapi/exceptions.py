@@ -1,3 +1,6 @@
+from typing import Any
+
+
 class Base(Exception):
     """
     Base exception
@@ -8,6 +11,16 @@ class RequestError(Base):
     Error when no response was received
     """
 
+class DeadlineExceeded(RequestError):
+    """
+    Error when the deadline of a call ran out before a response was received
+    """
+
+class CircuitOpen(RequestError):
+    """
+    Error when a circuit breaker rejected the request without sending it, because too many recent requests failed
+    """
+
 class AuthError(Base):
     """
     Parent exception type for errors performing login
@@ -83,6 +96,18 @@ class BatchCommandError(CommandError):
     Error when batch command IsSuccessful field is false
     """
 
+class ChunkedCommandError(CommandError):
+    """
+    Error when some chunks of a chunked batch or /Many command raised.
+    The other chunks were executed, `result` holds their merged results and
+    `errors` the exception of every failed chunk by the offset of its first item.
+    """
+
+    def __init__(self, message: str, result: Any, errors: dict[int, BaseException]) -> None:
+        super().__init__(message)
+        self.result = result
+        self.errors = errors
+
 class QueryError(Base):
     """
     Parent exception type only for when querying the API via GET requests.
@@ -0,0 +1,129 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Literal
+
+from .columnar import parse_select
+from .sync_client import SyncClient
+
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["ndjson", "csv"]
+
+def _encode_ndjson(records: list[dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode()
+
+def _encode_csv(records: list[dict[str, Any]], fields: list[str], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    for record in records:
+        writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+            for value in (record.get(field) for field in fields)
+        ])
+    return buffer.getvalue().encode()
+
+def _read_checkpoint(path: str, query: dict[str, Any]) -> dict[str, Any] | None:
+    try:
+        with open(path, encoding="utf-8") as file:
+            checkpoint = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if checkpoint.get("query") != query:
+        logger.warning(f"Checkpoint {path} belongs to another export, starting over")
+        return None
+    return checkpoint
+
+def _write_checkpoint(path: str, checkpoint: dict[str, Any]) -> None:
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary, path)
+
+
+def export(
+    client: SyncClient,
+    module: str,
+    entity: str,
+    path: str,
+    format: ExportFormat | None = None,
+    compress: bool | None = None,
+    language: str | None = None,
+    filter: str | None = None,
+    select: str | None = None,
+    expand: str | None = None,
+    orderby: str = "Id",
+    page_size: int = 1000,
+    prefetch: int = 2,
+    checkpoint_path: str | None = None,
+) -> int:
+    """
+    Streams a query page by page into an NDJSON or CSV file and returns the number of records in the file.
+    Format and gzip compression default to what the file name ends with, e.g. parts.csv.gz.
+
+    The next `prefetch` pages are fetched and decoded on worker threads while the current one is written,
+    so at most `prefetch + 1` pages are held in memory.
+    After every page the $skip reached and the file size are written to `checkpoint_path` (default: path + ".checkpoint").
+    An interrupted export started again with the same arguments truncates the file to the last checkpoint
+    and continues from there. The checkpoint is removed once the export is complete.
+    Resuming is only correct if `orderby` gives the records a stable order.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    compress = path.endswith(".gz") if compress is None else compress
+    format = format or ("csv" if name.endswith(".csv") else "ndjson")
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+    fields = parse_select(select) if select else None
+    query = {
+        "module": module, "entity": entity, "language": language, "filter": filter, "select": select,
+        "expand": expand, "orderby": orderby, "page_size": page_size, "format": format, "compress": compress,
+    }
+
+    checkpoint = _read_checkpoint(checkpoint_path, query) if os.path.exists(path) else None
+    file: BinaryIO
+    if checkpoint is not None:
+        skip, rows, fields = checkpoint["skip"], checkpoint["rows"], checkpoint["fields"]
+        logger.info(f"Resuming export of {module}/{entity} to {path} at $skip={skip}")
+        file = open(path, "r+b")
+        file.truncate(checkpoint["size"])
+        file.seek(checkpoint["size"])
+    else:
+        skip = rows = 0
+        file = open(path, "wb")
+
+    executor = ThreadPoolExecutor(max_workers=prefetch + 1, thread_name_prefix="monitorapi-export")
+    pending: deque[Future[Any]] = deque()
+    next_skip = skip
+    try:
+        while True:
+            while len(pending) <= prefetch:
+                pending.append(executor.submit(client.query, module, entity, None, language, filter, select, expand, orderby, page_size, next_skip))
+                next_skip += page_size
+            page = pending.popleft().result()
+            if page:
+                if fields is None:
+                    fields = list(page[0])
+                data = _encode_csv(page, fields, header=file.tell() == 0) if format == "csv" else _encode_ndjson(page)
+                # Every page is its own gzip member, so the file can be cut after any page and continued
+                file.write(gzip.compress(data, compresslevel=6) if compress else data)
+                file.flush()
+                rows += len(page)
+            skip += page_size
+            if len(page) < page_size:
+                break
+            _write_checkpoint(checkpoint_path, {"query": query, "skip": skip, "rows": rows, "size": file.tell(), "fields": fields})
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        file.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    logger.info(f"Exported {rows} records of {module}/{entity} to {path}")
+    return rows
@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+
+
+def format_literal(value: Any) -> str:
+    """
+    $filter literal of a Python value. Strings and dates are quoted, quotes in strings doubled.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise TypeError(f"Cannot use {value!r} in a filter")
+
+
+@dataclass(frozen=True)
+class Param:
+    """
+    Placeholder for a value given when the filter is rendered, e.g. Field("PartNumber") == Param("part_number").
+    """
+    name: str
+
+
+class Expression:
+
+    def __and__(self, other: "Expression") -> "Expression":
+        return Logical("and", (self, other))
+
+    def __or__(self, other: "Expression") -> "Expression":
+        return Logical("or", (self, other))
+
+    def __invert__(self) -> "Expression":
+        return Not(self)
+
+    def render(self, values: Mapping[str, Any] | None = None) -> str:
+        return compile_filter(self).render(values or {})
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+@dataclass(frozen=True)
+class Comparison(Expression):
+    field: str
+    operator: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class Logical(Expression):
+    operator: str
+    operands: tuple[Expression, ...]
+
+
+@dataclass(frozen=True)
+class Not(Expression):
+    operand: Expression
+
+
+@dataclass(frozen=True, eq=False)
+class Field:
+    """
+    Field of an entity to compare in a $filter, e.g. (Field("Id") >= 100) & (Field("Status") == Param("status")).
+    """
+    name: str
+
+    def __eq__(self, value: Any) -> Comparison:  # type: ignore[override]
+        return Comparison(self.name, "eq", value)
+
+    def __ne__(self, value: Any) -> Comparison:  # type: ignore[override]
+        return Comparison(self.name, "ne", value)
+
+    def __gt__(self, value: Any) -> Comparison:
+        return Comparison(self.name, "gt", value)
+
+    def __ge__(self, value: Any) -> Comparison:
+        return Comparison(self.name, "ge", value)
+
+    def __lt__(self, value: Any) -> Comparison:
+        return Comparison(self.name, "lt", value)
+
+    def __le__(self, value: Any) -> Comparison:
+        return Comparison(self.name, "le", value)
+
+    def __hash__(self) -> int:
+        return hash(self.name)
+
+    def in_(self, values: Iterable[Any]) -> Expression:
+        comparisons = tuple(Comparison(self.name, "eq", value) for value in values)
+        if not comparisons:
+            raise ValueError(f"No values to match {self.name} against")
+        return comparisons[0] if len(comparisons) == 1 else Logical("or", comparisons)
+
+
+class CompiledFilter:
+    """
+    A filter expression turned into text segments and parameter names, rendered by joining them with the parameter values.
+    """
+
+    def __init__(self, segments: list[str | Param]) -> None:
+        merged: list[str | Param] = []
+        for segment in segments:
+            if isinstance(segment, str) and merged and isinstance(merged[-1], str):
+                merged[-1] += segment
+            else:
+                merged.append(segment)
+        self.segments = tuple(merged)
+        self.params = frozenset(segment.name for segment in merged if isinstance(segment, Param))
+        self._text = merged[0] if len(merged) == 1 and isinstance(merged[0], str) else None
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        if self._text is not None:
+            return self._text
+        missing = self.params - values.keys()
+        if missing:
+            raise KeyError(f"Missing filter parameters: {', '.join(sorted(missing))}")
+        return "".join(segment if isinstance(segment, str) else format_literal(values[segment.name]) for segment in self.segments)
+
+
+def _compile(expression: Expression, segments: list[str | Param], parent: str | None) -> None:
+    if isinstance(expression, Comparison):
+        segments.append(f"{expression.field} {expression.operator} ")
+        segments.append(expression.value if isinstance(expression.value, Param) else format_literal(expression.value))
+    elif isinstance(expression, Logical):
+        parenthesized = parent is not None and parent != expression.operator
+        if parenthesized:
+            segments.append("(")
+        for index, operand in enumerate(expression.operands):
+            if index:
+                segments.append(f" {expression.operator} ")
+            _compile(operand, segments, expression.operator)
+        if parenthesized:
+            segments.append(")")
+    elif isinstance(expression, Not):
+        segments.append("not (")
+        _compile(expression.operand, segments, None)
+        segments.append(")")
+    else:
+        raise TypeError(f"Cannot compile {expression!r} into a filter")
+
+@lru_cache(maxsize=1024)
+def compile_filter(expression: Expression) -> CompiledFilter:
+    """
+    Compiles an expression once, later calls with an equal expression return the cached result.
+    """
+    segments: list[str | Param] = []
+    _compile(expression, segments, None)
+    return CompiledFilter(segments)
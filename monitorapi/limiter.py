@@ -0,0 +1,204 @@
+import httpx
+import asyncio
+import threading
+import time
+from typing import Any, Literal
+
+from .import exceptions as exc
+
+EndpointClass = Literal["query", "command", "batch"]
+
+def endpoint_class(request: httpx.Request) -> EndpointClass:
+    if request.method == "GET":
+        return "query"
+    if "/Batch" in request.url.path:
+        return "batch"
+    return "command"
+
+def is_overload(response: httpx.Response | None) -> bool:
+    """
+    True if the request failed in a way that suggests the server is overloaded.
+    No response means a transport error or timeout.
+    """
+    return response is None or response.status_code in (429, 500, 502, 503, 504)
+
+
+class AIMDLimit:
+    """
+    Additive increase, multiplicative decrease concurrency limit.
+
+    Every successful request raises the limit by `increase / limit`, so by about `increase` per round of requests.
+    A failed request, or one slower than `latency_target` seconds, multiplies the limit by `decrease`.
+    Requests started before the last decrease cannot lower the limit again, so a burst of failures
+    from the same round only counts once.
+    """
+
+    def __init__(self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        increase: float = 1.0,
+        decrease: float = 0.7,
+        latency_target: float | None = None,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self._limit = float(initial)
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def on_sample(self, started: float, latency: float, failed: bool) -> None:
+        if failed or (self.latency_target is not None and latency > self.latency_target):
+            if started >= self._last_decrease:
+                self._limit = max(self._limit * self.decrease, self.min_limit)
+                self._last_decrease = time.monotonic()
+        else:
+            self._limit = min(self._limit + self.increase / self._limit, self.max_limit)
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns how many seconds the caller has to wait before using it.
+        """
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst) - 1
+        self._updated = now
+        return max(-self._tokens / self.rate, 0.0)
+
+
+class _BaseLimiter:
+    """
+    Limits requests of a client by an adaptive concurrency limit and fixed rates per endpoint class.
+
+    `rates` maps "query", "command" or "batch" to requests per second.
+    Without a concurrency limit only the rates are enforced.
+    """
+
+    def __init__(self, concurrency: AIMDLimit | None = None, rates: dict[EndpointClass, float] | None = None) -> None:
+        self.concurrency = concurrency
+        self.buckets = {kind: TokenBucket(rate) for kind, rate in (rates or {}).items()}
+        self.in_flight = 0
+        self.queued = 0
+
+    @property
+    def limit(self) -> int | None:
+        return self.concurrency.limit if self.concurrency is not None else None
+
+    def _has_slot(self) -> bool:
+        return self.concurrency is None or self.in_flight < max(self.concurrency.limit, 1)
+
+    def _reserve(self, kind: EndpointClass) -> float:
+        bucket = self.buckets.get(kind)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+        }
+
+
+class SyncLimiter(_BaseLimiter):
+
+    def __init__(self, concurrency: AIMDLimit | None = None, rates: dict[EndpointClass, float] | None = None) -> None:
+        super().__init__(concurrency, rates)
+        self._condition = threading.Condition()
+
+    def acquire(self, kind: EndpointClass, timeout: float | None = None) -> float:
+        """
+        Blocks until the request may be sent and returns its start time for release().
+        Raises DeadlineExceeded if that takes longer than `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            self.queued += 1
+            delay = self._reserve(kind)
+        try:
+            if delay:
+                if timeout is not None and delay >= timeout:
+                    raise exc.DeadlineExceeded("Deadline exceeded waiting for the rate limit")
+                time.sleep(delay)
+            with self._condition:
+                while not self._has_slot():
+                    if deadline is None:
+                        self._condition.wait()
+                    elif not self._condition.wait(deadline - time.monotonic()):
+                        raise exc.DeadlineExceeded("Deadline exceeded waiting for the concurrency limit")
+                self.in_flight += 1
+        finally:
+            with self._condition:
+                self.queued -= 1
+        return time.monotonic()
+
+    def release(self, started: float, failed: bool | None) -> None:
+        """
+        Frees the request's slot. `failed` is None for a request that ended without a response or transport error,
+        e.g. because it was cancelled. That says nothing about the server, so it is not fed to the concurrency limit.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if self.concurrency is not None and failed is not None:
+                self.concurrency.on_sample(started, time.monotonic() - started, failed)
+            self._condition.notify_all()
+
+
+class AsyncLimiter(_BaseLimiter):
+
+    def __init__(self, concurrency: AIMDLimit | None = None, rates: dict[EndpointClass, float] | None = None) -> None:
+        super().__init__(concurrency, rates)
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, kind: EndpointClass, timeout: float | None = None) -> float:
+        """
+        Waits until the request may be sent and returns its start time for release().
+        Raises DeadlineExceeded if that takes longer than `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self.queued += 1
+        try:
+            delay = self._reserve(kind)
+            if delay:
+                if timeout is not None and delay >= timeout:
+                    raise exc.DeadlineExceeded("Deadline exceeded waiting for the rate limit")
+                await asyncio.sleep(delay)
+            async with self._condition:
+                if deadline is None:
+                    await self._condition.wait_for(self._has_slot)
+                else:
+                    try:
+                        await asyncio.wait_for(self._condition.wait_for(self._has_slot), deadline - time.monotonic())
+                    except asyncio.TimeoutError:
+                        raise exc.DeadlineExceeded("Deadline exceeded waiting for the concurrency limit")
+                self.in_flight += 1
+        finally:
+            self.queued -= 1
+        return time.monotonic()
+
+    async def release(self, started: float, failed: bool | None) -> None:
+        """
+        Frees the request's slot. `failed` is None for a request that ended without a response or transport error,
+        e.g. because it was cancelled. That says nothing about the server, so it is not fed to the concurrency limit.
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if self.concurrency is not None and failed is not None:
+                self.concurrency.on_sample(started, time.monotonic() - started, failed)
+            self._condition.notify_all()
@@ -0,0 +1,181 @@
+import httpx
+import threading
+import time
+from bisect import bisect_left
+from typing import Any
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def endpoint_label(request: httpx.Request) -> str:
+    """
+    Module/Entity for queries without the id, Module/Namespace/Command for commands and Batch for batches.
+    """
+    path = request.url.path.split("/api/", 1)[-1]
+    parts = [part for part in path.split("/")[1:] if part]
+    if request.method == "GET":
+        parts = parts[:2]
+    return "/".join(parts)
+
+def _received_bytes(response: httpx.Response) -> int:
+    # Responses not read through a network stream, like from a MockTransport, have no download count
+    if response.num_bytes_downloaded:
+        return response.num_bytes_downloaded
+    try:
+        return len(response.content)
+    except httpx.ResponseNotRead:
+        return 0
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """
+    Counters, gauges and latency histograms of one or more clients, without any dependencies.
+    Pass the same instance to several clients to aggregate them.
+    Read them with snapshot() or prometheus() for the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests: dict[tuple[str, str, int | None], int] = {}
+        self._latency: dict[str, Histogram] = {}
+        self._errors: dict[str, int] = {}
+        self._queue_wait: dict[str, Histogram] = {}
+        self.logins = 0
+        self.login_wait_seconds = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.in_flight = 0
+
+    def request_started(self) -> float:
+        with self._lock:
+            self.in_flight += 1
+        return time.monotonic()
+
+    def request_finished(self, request: httpx.Request, response: httpx.Response | None, started: float) -> None:
+        elapsed = time.monotonic() - started
+        endpoint = endpoint_label(request)
+        status = response.status_code if response is not None else None
+        with self._lock:
+            self.in_flight -= 1
+            key = (request.method, endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get(endpoint)
+            if histogram is None:
+                histogram = self._latency[endpoint] = Histogram(self.buckets)
+            histogram.observe(elapsed)
+            self.bytes_sent += len(request.content)
+            if response is not None:
+                self.bytes_received += _received_bytes(response)
+
+    def record_error(self, error: Exception) -> None:
+        name = error.__class__.__name__
+        with self._lock:
+            self._errors[name] = self._errors.get(name, 0) + 1
+
+    def record_login(self) -> None:
+        with self._lock:
+            self.logins += 1
+
+    def record_login_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.login_wait_seconds += seconds
+
+    def record_queue_wait(self, priority: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._queue_wait.get(priority)
+            if histogram is None:
+                histogram = self._queue_wait[priority] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": [
+                    {"method": method, "endpoint": endpoint, "status": status, "count": count}
+                    for (method, endpoint, status), count in self._requests.items()
+                ],
+                "latency": {
+                    endpoint: {"count": histogram.count, "sum": histogram.sum, "buckets": dict(histogram.cumulative())}
+                    for endpoint, histogram in self._latency.items()
+                },
+                "errors": dict(self._errors),
+                "queue_wait": {
+                    priority: {"count": histogram.count, "sum": histogram.sum, "buckets": dict(histogram.cumulative())}
+                    for priority, histogram in self._queue_wait.items()
+                },
+                "logins": self.logins,
+                "login_wait_seconds": self.login_wait_seconds,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "in_flight": self.in_flight,
+            }
+
+    def prometheus(self, prefix: str = "monitorapi") -> str:
+        with self._lock:
+            lines = [
+                f"# TYPE {prefix}_requests_total counter",
+                *(
+                    f'{prefix}_requests_total{{method="{method}",endpoint="{_escape(endpoint)}",status="{status or ""}"}} {count}'
+                    for (method, endpoint, status), count in self._requests.items()
+                ),
+                f"# TYPE {prefix}_request_duration_seconds histogram",
+            ]
+            for endpoint, histogram in self._latency.items():
+                label = f'endpoint="{_escape(endpoint)}"'
+                lines.extend(
+                    f'{prefix}_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}'
+                    for bound, count in histogram.cumulative()
+                )
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{label}}} {histogram.sum}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{label}}} {histogram.count}")
+            if self._queue_wait:
+                lines.append(f"# TYPE {prefix}_queue_wait_seconds histogram")
+            for priority, histogram in self._queue_wait.items():
+                label = f'priority="{_escape(priority)}"'
+                lines.extend(
+                    f'{prefix}_queue_wait_seconds_bucket{{{label},le="{bound}"}} {count}'
+                    for bound, count in histogram.cumulative()
+                )
+                lines.append(f"{prefix}_queue_wait_seconds_sum{{{label}}} {histogram.sum}")
+                lines.append(f"{prefix}_queue_wait_seconds_count{{{label}}} {histogram.count}")
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+            lines.extend(f'{prefix}_errors_total{{exception="{name}"}} {count}' for name, count in self._errors.items())
+            lines.extend([
+                f"# TYPE {prefix}_logins_total counter",
+                f"{prefix}_logins_total {self.logins}",
+                f"# TYPE {prefix}_login_wait_seconds_total counter",
+                f"{prefix}_login_wait_seconds_total {self.login_wait_seconds}",
+                f"# TYPE {prefix}_bytes_sent_total counter",
+                f"{prefix}_bytes_sent_total {self.bytes_sent}",
+                f"# TYPE {prefix}_bytes_received_total counter",
+                f"{prefix}_bytes_received_total {self.bytes_received}",
+                f"# TYPE {prefix}_requests_in_flight gauge",
+                f"{prefix}_requests_in_flight {self.in_flight}",
+            ])
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,267 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from .async_client import AsyncClient
+from .columnar import parse_select
+from .sync_client import SyncClient
+
+
+logger = logging.getLogger(__name__)
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _literal(value: Any) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+@dataclass
+class MirroredEntity:
+    module: str
+    entity: str
+    fields: list[str]
+    change_field: str | None
+    filter: str | None
+
+    @property
+    def table(self) -> str:
+        return _quote(f"{self.module}/{self.entity}")
+
+
+class _BaseEntityMirror:
+    """
+    Local SQLite copy of chosen entities, answering lookups by id and by column values without calling the API.
+
+    The first refresh of an entity loads all of it, later ones only fetch what changed:
+    records whose `change_field` (e.g. a modification timestamp) is at least the highest value seen so far,
+    or without a change_field records with a higher Id than seen so far, which only picks up new records.
+    Deleted records are only dropped by a full refresh.
+    """
+
+    def __init__(self, path: str = ":memory:", page_size: int = 500) -> None:
+        self.page_size = page_size
+        self.entities: dict[tuple[str, str], MirroredEntity] = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS mirror_state ("
+            "module TEXT, entity TEXT, high_water_mark TEXT, loaded_at REAL, refreshed_at REAL, "
+            "PRIMARY KEY (module, entity))"
+        )
+
+    def add(self, module: str, entity: str, select: str, change_field: str | None = None, filter: str | None = None) -> None:
+        """
+        Mirrors the `select` fields of an entity, restricted by `filter`. Id and change_field are always included.
+        """
+        fields = parse_select(select)
+        for field in ("Id", change_field):
+            if field is not None and field not in fields:
+                fields.insert(0, field)
+        mirrored = MirroredEntity(module, entity, fields, change_field, filter)
+        columns = ", ".join(f"{_quote(field)}{' INTEGER PRIMARY KEY' if field == 'Id' else ''}" for field in fields)
+        with self._lock:
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {mirrored.table} ({columns}, _record TEXT)")
+            existing = {row["name"] for row in self._connection.execute(f"PRAGMA table_info({mirrored.table})")}
+            for field in fields:
+                if field not in existing:
+                    self._connection.execute(f"ALTER TABLE {mirrored.table} ADD COLUMN {_quote(field)}")
+            self.entities[(module, entity)] = mirrored
+
+    def _mirrored(self, module: str, entity: str) -> MirroredEntity:
+        try:
+            return self.entities[(module, entity)]
+        except KeyError:
+            raise KeyError(f"{module}/{entity} is not mirrored") from None
+
+    def _selected(self, module: str | None, entity: str | None) -> list[MirroredEntity]:
+        return [
+            mirrored for mirrored in self.entities.values()
+            if (module is None or mirrored.module == module) and (entity is None or mirrored.entity == entity)
+        ]
+
+    def _high_water_mark(self, mirrored: MirroredEntity) -> str | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT high_water_mark FROM mirror_state WHERE module = ? AND entity = ?", (mirrored.module, mirrored.entity)
+            ).fetchone()
+        return row["high_water_mark"] if row is not None else None
+
+    def _delta_query(self, mirrored: MirroredEntity, full: bool) -> tuple[str | None, str, str | None]:
+        """
+        Returns the filter, orderby and current high-water mark of the next refresh.
+        """
+        high_water_mark = None if full else self._high_water_mark(mirrored)
+        marker = mirrored.change_field or "Id"
+        filter = mirrored.filter
+        if high_water_mark is not None:
+            value = json.loads(high_water_mark)
+            # A timestamp can be shared by several changes, so records at the mark are fetched again
+            delta = f"{marker} ge {_literal(value)}" if mirrored.change_field else f"Id gt {value}"
+            filter = f"({filter}) and {delta}" if filter else delta
+        orderby = "Id" if mirrored.change_field is None else f"{mirrored.change_field},Id"
+        return filter, orderby, high_water_mark
+
+    def _store(self, mirrored: MirroredEntity, records: list[dict[str, Any]]) -> None:
+        columns = ", ".join([*map(_quote, mirrored.fields), "_record"])
+        placeholders = ", ".join("?" * (len(mirrored.fields) + 1))
+        self._connection.executemany(
+            f"INSERT OR REPLACE INTO {mirrored.table} ({columns}) VALUES ({placeholders})",
+            [
+                [
+                    *(
+                        json.dumps(value) if isinstance(value, (dict, list)) else value
+                        for value in (record.get(field) for field in mirrored.fields)
+                    ),
+                    json.dumps(record),
+                ]
+                for record in records
+            ],
+        )
+
+    def _apply(self, mirrored: MirroredEntity, full: bool, records: list[dict[str, Any]], high_water_mark: str | None) -> None:
+        """
+        Writes fetched records in one transaction, so lookups never see a partial refresh.
+        The records are fetched before, so lookups are not blocked while waiting for the API.
+        """
+        for record in records:
+            high_water_mark = self._advance(mirrored, high_water_mark, record)
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                if full:
+                    self._connection.execute(f"DELETE FROM {mirrored.table}")
+                self._store(mirrored, records)
+                self._connection.execute(
+                    "INSERT INTO mirror_state VALUES (?, ?, ?, ?, ?) ON CONFLICT (module, entity) DO UPDATE SET "
+                    "high_water_mark = excluded.high_water_mark, refreshed_at = excluded.refreshed_at, "
+                    "loaded_at = CASE WHEN ? THEN excluded.loaded_at ELSE loaded_at END",
+                    (mirrored.module, mirrored.entity, high_water_mark, now, now, full),
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        logger.debug("Refreshed %s/%s with %s records", mirrored.module, mirrored.entity, len(records))
+
+    def _needs_full_load(self, mirrored: MirroredEntity, full: bool) -> bool:
+        return full or self._high_water_mark(mirrored) is None
+
+    @staticmethod
+    def _advance(mirrored: MirroredEntity, high_water_mark: str | None, record: dict[str, Any]) -> str | None:
+        value = record.get(mirrored.change_field or "Id")
+        if value is None:
+            return high_water_mark
+        if high_water_mark is None or value > json.loads(high_water_mark):
+            return json.dumps(value)
+        return high_water_mark
+
+    def get(self, module: str, entity: str, id: int) -> dict[str, Any] | None:
+        mirrored = self._mirrored(module, entity)
+        with self._lock:
+            row = self._connection.execute(f"SELECT _record FROM {mirrored.table} WHERE Id = ?", (id,)).fetchone()
+        return json.loads(row["_record"]) if row is not None else None
+
+    def find(self, module: str, entity: str, **conditions: Any) -> list[dict[str, Any]]:
+        """
+        Records whose mirrored fields equal the given values, e.g. find("Inventory", "Parts", PartNumber="P1").
+        A list or tuple matches any of its values.
+        """
+        mirrored = self._mirrored(module, entity)
+        clauses = []
+        params: list[Any] = []
+        for field, value in conditions.items():
+            if field not in mirrored.fields:
+                raise ValueError(f"{field} is not mirrored for {module}/{entity}")
+            if isinstance(value, (list, tuple)):
+                clauses.append(f"{_quote(field)} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is None:
+                clauses.append(f"{_quote(field)} IS NULL")
+            else:
+                clauses.append(f"{_quote(field)} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._connection.execute(f"SELECT _record FROM {mirrored.table}{where} ORDER BY Id", params).fetchall()
+        return [json.loads(row["_record"]) for row in rows]
+
+    def staleness(self) -> list[dict[str, Any]]:
+        """
+        Per mirrored entity the number of records, the time of the last full load and refresh, their age in seconds
+        and the high-water mark of the next delta refresh. Entities never refreshed have None.
+        """
+        now = time.time()
+        report = []
+        for mirrored in self.entities.values():
+            with self._lock:
+                rows = self._connection.execute(f"SELECT COUNT(*) FROM {mirrored.table}").fetchone()[0]
+                state = self._connection.execute(
+                    "SELECT * FROM mirror_state WHERE module = ? AND entity = ?", (mirrored.module, mirrored.entity)
+                ).fetchone()
+            refreshed_at = state["refreshed_at"] if state is not None else None
+            report.append({
+                "module": mirrored.module,
+                "entity": mirrored.entity,
+                "rows": rows,
+                "loaded_at": state["loaded_at"] if state is not None else None,
+                "refreshed_at": refreshed_at,
+                "age_seconds": now - refreshed_at if refreshed_at is not None else None,
+                "high_water_mark": json.loads(state["high_water_mark"]) if state is not None and state["high_water_mark"] else None,
+            })
+        return report
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class EntityMirror(_BaseEntityMirror):
+
+    def __init__(self, client: SyncClient, path: str = ":memory:", page_size: int = 500) -> None:
+        super().__init__(path, page_size)
+        self.client = client
+
+    def refresh(self, module: str | None = None, entity: str | None = None, full: bool = False) -> dict[str, int]:
+        """
+        Refreshes the mirrored entities, or only those of `module` and `entity`, and returns the records fetched per entity.
+        """
+        return {f"{mirrored.module}/{mirrored.entity}": self._refresh(mirrored, full) for mirrored in self._selected(module, entity)}
+
+    def _refresh(self, mirrored: MirroredEntity, full: bool) -> int:
+        full = self._needs_full_load(mirrored, full)
+        filter, orderby, high_water_mark = self._delta_query(mirrored, full)
+        records = list(self.client.query_iter(mirrored.module, mirrored.entity, filter=filter, select=",".join(mirrored.fields), orderby=orderby, page_size=self.page_size))
+        self._apply(mirrored, full, records, high_water_mark)
+        return len(records)
+
+
+class AsyncEntityMirror(_BaseEntityMirror):
+    """
+    Like EntityMirror, refreshing through an AsyncClient. Lookups do not need the event loop.
+    """
+
+    def __init__(self, client: AsyncClient, path: str = ":memory:", page_size: int = 500) -> None:
+        super().__init__(path, page_size)
+        self.client = client
+
+    async def refresh(self, module: str | None = None, entity: str | None = None, full: bool = False) -> dict[str, int]:
+        return {f"{mirrored.module}/{mirrored.entity}": await self._refresh(mirrored, full) for mirrored in self._selected(module, entity)}
+
+    async def _refresh(self, mirrored: MirroredEntity, full: bool) -> int:
+        full = self._needs_full_load(mirrored, full)
+        filter, orderby, high_water_mark = self._delta_query(mirrored, full)
+        records = [
+            record async for record in self.client.query_iter(mirrored.module, mirrored.entity, filter=filter, select=",".join(mirrored.fields), orderby=orderby, page_size=self.page_size)
+        ]
+        self._apply(mirrored, full, records, high_water_mark)
+        return len(records)
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Generic, Iterable, Sequence, TypeVar
+
+from .async_client import AsyncClient
+from .base_client import BaseClient, BatchCommandEntity, NO_SESSION_ID
+from .columnar import ResultFormat
+from .filters import Expression
+from .sync_client import SyncClient
+from .import exceptions as exc
+
+
+logger = logging.getLogger(__name__)
+
+ClientT = TypeVar("ClientT", bound=BaseClient)
+
+class PoolMember(Generic[ClientT]):
+
+    def __init__(self, client: ClientT) -> None:
+        self.client = client
+        self.in_flight = 0
+        self.suspended_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return self.suspended_until <= now
+
+
+class _BaseClientPool(Generic[ClientT]):
+    """
+    Spreads calls over several clients logged in with different users, each with its own session.
+    Monitor allows only one session per user, so every client must use its own credentials.
+
+    Every call goes to the available client with the fewest calls in flight.
+    A client whose session gets suspended is taken out of rotation for `suspend_cooldown` seconds
+    and the call is retried on another client. When it comes back its session id is cleared,
+    so its first request gets a 401 and the client logs in again on its own.
+    """
+
+    def __init__(self, clients: Sequence[ClientT], suspend_cooldown: float = 60) -> None:
+        if not clients:
+            raise ValueError("ClientPool needs at least one client")
+        self.members = [PoolMember(client) for client in clients]
+        self.suspend_cooldown = suspend_cooldown
+
+    def _select(self) -> PoolMember[ClientT]:
+        now = time.monotonic()
+        available = [member for member in self.members if member.is_available(now)]
+        if not available:
+            raise exc.SessionSuspended("All sessions in the pool are suspended")
+        member = min(available, key=lambda member: member.in_flight)
+        member.in_flight += 1
+        return member
+
+    def _suspend(self, member: PoolMember[ClientT]) -> None:
+        logger.warning(f"Session of '{member.client.username}' suspended, taking it out of rotation for {self.suspend_cooldown}s")
+        member.suspended_until = time.monotonic() + self.suspend_cooldown
+        # Also drop it from the session store, so the next login is not skipped in favour of the suspended session
+        client = member.client
+        client.session_store.discard(client.session_key, client.x_monitor_session_id)
+        client.x_monitor_session_id = NO_SESSION_ID
+
+    def stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "username": member.client.username,
+                "in_flight": member.in_flight,
+                "suspended_for": max(member.suspended_until - now, 0.0),
+            }
+            for member in self.members
+        ]
+
+
+class SyncClientPool(_BaseClientPool[SyncClient]):
+
+    def __init__(self, clients: Sequence[SyncClient], suspend_cooldown: float = 60) -> None:
+        super().__init__(clients, suspend_cooldown)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_credentials(cls, credentials: Iterable[tuple[str, str]], company_number: str, base_url: str, suspend_cooldown: float = 60, **kwargs: Any) -> "SyncClientPool":
+        """
+        Creates one SyncClient per (username, password) pair. Remaining keyword arguments are passed to every client.
+        """
+        return cls([SyncClient(company_number, username, password, base_url, **kwargs) for username, password in credentials], suspend_cooldown)
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        for _ in self.members:
+            with self._lock:
+                member = self._select()
+            try:
+                return getattr(member.client, method)(*args, **kwargs)
+            except exc.SessionSuspended:
+                with self._lock:
+                    self._suspend(member)
+            finally:
+                with self._lock:
+                    member.in_flight -= 1
+        raise exc.SessionSuspended("All sessions in the pool are suspended")
+
+    def login(self) -> None:
+        for member in self.members:
+            member.client.login()
+
+    def close(self) -> None:
+        for member in self.members:
+            member.client.close()
+
+    def query(self,
+        module: str,
+        entity: str,
+        id: int | None = None,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        top: int | None = None,
+        skip: int | None = None,
+        result_format: ResultFormat = "dicts",
+    ) -> Any:
+        return self._call("query", module, entity, id, language, filter, select, expand, orderby, top, skip, result_format)
+
+    def command(self,
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+        body: Any | None = None,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
+    ) -> Any:
+        return self._call("command", module, namespace, command, many, simulate, validate, language, body, chunk_size, concurrency)
+
+    def batch(self,
+        commands: list[BatchCommandEntity],
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+        raise_on_error: bool = False,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
+    ) -> Any:
+        return self._call("batch", commands, simulate, validate, language, raise_on_error, chunk_size, concurrency)
+
+
+class AsyncClientPool(_BaseClientPool[AsyncClient]):
+
+    @classmethod
+    def from_credentials(cls, credentials: Iterable[tuple[str, str]], company_number: str, base_url: str, suspend_cooldown: float = 60, **kwargs: Any) -> "AsyncClientPool":
+        """
+        Creates one AsyncClient per (username, password) pair. Remaining keyword arguments are passed to every client.
+        """
+        return cls([AsyncClient(company_number, username, password, base_url, **kwargs) for username, password in credentials], suspend_cooldown)
+
+    async def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        for _ in self.members:
+            member = self._select()
+            try:
+                return await getattr(member.client, method)(*args, **kwargs)
+            except exc.SessionSuspended:
+                self._suspend(member)
+            finally:
+                member.in_flight -= 1
+        raise exc.SessionSuspended("All sessions in the pool are suspended")
+
+    async def login(self) -> None:
+        await asyncio.gather(*(member.client.login() for member in self.members))
+
+    async def close(self) -> None:
+        await asyncio.gather(*(member.client.close() for member in self.members))
+
+    async def query(self,
+        module: str,
+        entity: str,
+        id: int | None = None,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        top: int | None = None,
+        skip: int | None = None,
+        result_format: ResultFormat = "dicts",
+    ) -> Any:
+        return await self._call("query", module, entity, id, language, filter, select, expand, orderby, top, skip, result_format)
+
+    async def command(self,
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+        body: Any | None = None,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
+    ) -> Any:
+        return await self._call("command", module, namespace, command, many, simulate, validate, language, body, chunk_size, concurrency)
+
+    async def batch(self,
+        commands: list[BatchCommandEntity],
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+        raise_on_error: bool = False,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
+    ) -> Any:
+        return await self._call("batch", commands, simulate, validate, language, raise_on_error, chunk_size, concurrency)
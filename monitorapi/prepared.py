@@ -0,0 +1,90 @@
+import httpx
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+from .base_client import X_MONITOR_SESSION_ID_HEADER
+from .columnar import ResultFormat
+from .filters import Expression, compile_filter
+
+if TYPE_CHECKING:
+    from .base_client import BaseClient
+
+
+class PreparedQuery:
+    """
+    A query with its URL and constant parameters encoded once, created by client.prepare_query.
+    Calling it takes only what changes between calls: the id, $top, $skip and the values of the filter's Params,
+    e.g. by_part_number(part_number="P1") for filter=Field("PartNumber") == Param("part_number").
+    Returns the result of the query like client.query, awaitable on an AsyncClient.
+    """
+
+    def __init__(self,
+        client: "BaseClient",
+        module: str,
+        entity: str,
+        language: str | None = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        result_format: ResultFormat = "dicts",
+    ) -> None:
+        self.client = client
+        self.module = module
+        self.entity = entity
+        self.select = select
+        self.result_format = result_format
+        self.url = f"{client.base_url}/{language or client.language_code}/{client.company_number}/api/{client.api_version}/{module}/{entity}/"
+        self._filter = compile_filter(filter) if isinstance(filter, Expression) else None
+        if self._filter is not None and self._filter.params & {"id", "top", "skip"}:
+            raise ValueError("Filter parameters cannot be named id, top or skip")
+        self._filter_text = filter if isinstance(filter, str) else None
+        params = {"$select": select, "$expand": expand, "$orderby": orderby}
+        self._params = urlencode({name: value for name, value in params.items() if value is not None})
+
+    def request(self, id: int | None = None, top: int | None = None, skip: int | None = None, **values: Any) -> httpx.Request:
+        parts = []
+        filter = self._filter.render(values) if self._filter is not None else self._filter_text
+        if filter is not None:
+            parts.append(urlencode({"$filter": filter}))
+        if self._params:
+            parts.append(self._params)
+        if top is not None:
+            parts.append(f"%24top={top}")
+        if skip is not None:
+            parts.append(f"%24skip={skip}")
+        url = self.url if id is None else f"{self.url}{id}"
+        if parts:
+            url = f"{url}?{'&'.join(parts)}"
+        return httpx.Request("GET", url, headers={X_MONITOR_SESSION_ID_HEADER: self.client.x_monitor_session_id})
+
+    def __call__(self, id: int | None = None, top: int | None = None, skip: int | None = None, **values: Any) -> Any:
+        return self.client._query_prepared(self, self.request(id, top, skip, **values))
+
+
+class PreparedCommand:
+    """
+    A command with its URL built once, created by client.prepare_command. Calling it with a body sends the command.
+    """
+
+    def __init__(self,
+        client: "BaseClient",
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+    ) -> None:
+        self.client = client
+        self.module = module
+        self.namespace = namespace
+        self.invalidated_paths = [] if simulate or validate else [f"{module}/{namespace}"]
+        self.url = client._create_command_request(module, namespace, command, None, many, simulate, validate, language).url
+
+    def request(self, body: Any | None = None) -> httpx.Request:
+        return httpx.Request("POST", self.url, headers={X_MONITOR_SESSION_ID_HEADER: self.client.x_monitor_session_id}, json=body)
+
+    def __call__(self, body: Any | None = None) -> Any:
+        return self.client._command_prepared(self, self.request(body))
@@ -0,0 +1,223 @@
+import asyncio
+import gzip
+import httpx
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any
+
+from .async_client import AsyncClient
+from .base_client import X_MONITOR_SESSION_ID_HEADER, _PASSWORD_PATTERN, _elapsed_ms, _read_content
+from .deadline import in_context
+from .sync_client import SyncClient
+from .import exceptions as exc
+
+
+REPLAYED_SESSION_ID = "replayed-session-id"
+
+_KEPT_HEADERS = ("content-type", X_MONITOR_SESSION_ID_HEADER)
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")  # type: ignore[return-value]
+    return open(path, mode, encoding="utf-8")
+
+
+class TrafficRecorder:
+    """
+    Writes every request of a client and its response to an NDJSON log, gzip-compressed if the path ends with .gz.
+    Use it as the client's trace_hook, e.g. SyncClient(..., trace_hook=TrafficRecorder("traffic.ndjson.gz")).
+
+    Every line holds the start time relative to the first request, the duration, method, path with query,
+    request body, status, content type and response body. Passwords and session ids are redacted and the host is dropped,
+    so a log can be replayed against any base_url. Bodies of streamed responses are not recorded.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = _open(path, "w")
+        self._lock = threading.Lock()
+        self._started: float | None = None
+
+    def __call__(self, request: httpx.Request, response: httpx.Response | None) -> None:
+        if response is None:
+            return
+        now = time.monotonic()
+        elapsed = _elapsed_ms(response)
+        duration = elapsed / 1000 if elapsed is not None else 0.0
+        content = _read_content(response)
+        body = request.content
+        if b'"Password"' in body:
+            body = _PASSWORD_PATTERN.sub(rb'\1"***"', body)
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        if X_MONITOR_SESSION_ID_HEADER in headers:
+            headers[X_MONITOR_SESSION_ID_HEADER] = REPLAYED_SESSION_ID
+        with self._lock:
+            if self._started is None:
+                self._started = now - duration
+            entry = {
+                "t": round(now - duration - self._started, 6),
+                "d": round(duration, 6),
+                "m": request.method,
+                "u": request.url.raw_path.decode("ascii"),
+                "q": body.decode("utf-8", "replace") if body else None,
+                "s": response.status_code,
+                "h": headers,
+                "b": content.decode("utf-8", "replace") if content is not None else None,
+            }
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "TrafficRecorder":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def load_traffic(path: str) -> list[dict[str, Any]]:
+    with _open(path, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Serves recorded responses to a SyncClient or AsyncClient without any network.
+    Requests are matched by method, path and query. Repeated requests get the recorded responses in turn, starting over after the last.
+    Unrecorded requests get a 404.
+
+    Every response is delayed by its recorded duration divided by `speed`, so speed=1 keeps the original timing,
+    speed=10 is ten times faster and speed=None does not wait at all.
+    """
+
+    def __init__(self, traffic: str | list[dict[str, Any]], speed: float | None = 1.0) -> None:
+        entries = load_traffic(traffic) if isinstance(traffic, str) else traffic
+        self.speed = speed
+        self._responses: dict[tuple[str, str], list[dict[str, Any]]] = defaultdict(list)
+        for entry in entries:
+            self._responses[(entry["m"], entry["u"])].append(entry)
+        self._positions: dict[tuple[str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _next(self, request: httpx.Request) -> tuple[dict[str, Any] | None, float]:
+        key = (request.method, request.url.raw_path.decode("ascii"))
+        with self._lock:
+            recorded = self._responses.get(key)
+            if not recorded:
+                return None, 0.0
+            entry = recorded[self._positions[key] % len(recorded)]
+            self._positions[key] += 1
+        return entry, entry["d"] / self.speed if self.speed else 0.0
+
+    @staticmethod
+    def _response(entry: dict[str, Any] | None) -> httpx.Response:
+        if entry is None:
+            return httpx.Response(404, text="Not recorded")
+        return httpx.Response(entry["s"], headers=entry["h"], content=(entry["b"] or "").encode())
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        entry, delay = self._next(request)
+        if delay:
+            time.sleep(delay)
+        return self._response(entry)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        entry, delay = self._next(request)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._response(entry)
+
+
+def _replay_schedule(entries: list[dict[str, Any]], speed: float | None, multiplier: int) -> list[tuple[float, dict[str, Any]]]:
+    # Logins are left out, the client logs in by itself when the replayed requests are rejected
+    return sorted(
+        ((entry["t"] / speed if speed else 0.0, entry) for entry in entries if not entry["u"].endswith("/login") for _ in range(multiplier)),
+        key=lambda scheduled: scheduled[0],
+    )
+
+def _replay_request(base_url: str, entry: dict[str, Any]) -> httpx.Request:
+    content = entry["q"].encode() if entry["q"] is not None else None
+    headers = {"content-type": "application/json"} if content is not None else None
+    return httpx.Request(entry["m"], httpx.URL(base_url).join(entry["u"]), content=content, headers=headers)
+
+def _replay_summary(latencies: list[float], errors: int, seconds: float) -> dict[str, Any]:
+    latencies.sort()
+    def quantile(q: float) -> float | None:
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)] if latencies else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": seconds,
+        "throughput": len(latencies) / seconds if seconds else 0.0,
+        "p50": quantile(0.5),
+        "p99": quantile(0.99),
+    }
+
+def replay(client: SyncClient, traffic: str | list[dict[str, Any]], speed: float | None = 1.0, multiplier: int = 1, concurrency: int = 100) -> dict[str, Any]:
+    """
+    Sends the recorded requests through the client at their recorded start times divided by `speed`,
+    every request `multiplier` times, with at most `concurrency` requests in flight. speed=None sends them as fast as possible.
+    The requests run on threads of their own rather than the client's executor, so max_workers does not limit the replay.
+    Combine it with a client using a ReplayTransport to load-test the client without a server.
+    Returns the number of requests, errors, duration, throughput and p50/p99 latency in seconds.
+    """
+    entries = load_traffic(traffic) if isinstance(traffic, str) else traffic
+    latencies: list[float] = []
+    errors: list[bool] = []
+    started = time.monotonic()
+
+    def send(entry: dict[str, Any]) -> None:
+        sent = time.monotonic()
+        try:
+            response = client._make_api_request(_replay_request(client.base_url, entry))
+            if response.is_error:
+                errors.append(True)
+        except exc.Base:
+            errors.append(True)
+        latencies.append(time.monotonic() - sent)
+
+    futures: list[Future[None]] = []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="monitorapi-replay") as executor:
+        for offset, entry in _replay_schedule(entries, speed, multiplier):
+            # Waiting here instead of on the threads keeps them free for the requests due
+            delay = started + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(in_context(send), entry))
+    for future in futures:
+        future.result()
+    return _replay_summary(latencies, len(errors), time.monotonic() - started)
+
+async def replay_async(client: AsyncClient, traffic: str | list[dict[str, Any]], speed: float | None = 1.0, multiplier: int = 1, concurrency: int = 100) -> dict[str, Any]:
+    """
+    Like replay with an AsyncClient, with at most `concurrency` requests in flight.
+    """
+    entries = load_traffic(traffic) if isinstance(traffic, str) else traffic
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.monotonic()
+
+    async def send(offset: float, entry: dict[str, Any]) -> None:
+        nonlocal errors
+        delay = started + offset - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            sent = time.monotonic()
+            try:
+                response = await client._make_api_request(_replay_request(client.base_url, entry))
+                errors += response.is_error
+            except exc.Base:
+                errors += 1
+            latencies.append(time.monotonic() - sent)
+
+    await asyncio.gather(*(send(offset, entry) for offset, entry in _replay_schedule(entries, speed, multiplier)))
+    return _replay_summary(latencies, errors, time.monotonic() - started)
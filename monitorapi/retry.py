@@ -0,0 +1,101 @@
+import random
+import threading
+from collections import deque
+
+from .import exceptions as exc
+
+
+# Queries are idempotent and can be sent again after any failure where the server might recover.
+DEFAULT_QUERY_RETRIES: dict[type[exc.Base], int] = {
+    exc.RequestError: 3,
+    exc.UnhandledException: 2,
+}
+
+# A command may have been executed even if no response was received, so only documented safe cases are retried.
+DEFAULT_COMMAND_RETRIES: dict[type[exc.Base], int] = {
+    exc.CommandConflict: 3,
+}
+
+class LatencyTracker:
+    """
+    Keeps the latencies of the last `window` requests and their quantiles.
+    """
+
+    def __init__(self, window: int = 500) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._sorted: list[float] = []
+        self._dirty = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+            self._dirty += 1
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            if not self._samples:
+                return None
+            # Sorting is only repeated after every 5% of the window changed
+            if not self._sorted or self._dirty * 20 >= len(self._samples):
+                self._sorted = sorted(self._samples)
+                self._dirty = 0
+            return self._sorted[min(int(q * len(self._sorted)), len(self._sorted) - 1)]
+
+
+class RetryPolicy:
+    """
+    Decides which failed queries and commands are sent again and how long to wait before.
+
+    Every exception type has its own budget of retries, matched with isinstance in the order of the dict.
+    The wait grows exponentially from `backoff` up to `max_backoff` seconds with full jitter,
+    so clients failing at the same time do not retry at the same time.
+
+    With hedge=True a query that has not answered after the `hedge_quantile` latency of recent queries
+    is sent a second time and whichever copy answers first is used.
+    Hedging starts once `hedge_min_samples` latencies were recorded.
+    """
+
+    def __init__(self,
+        query_retries: dict[type[exc.Base], int] | None = None,
+        command_retries: dict[type[exc.Base], int] | None = None,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 50,
+    ) -> None:
+        self.query_retries = DEFAULT_QUERY_RETRIES if query_retries is None else query_retries
+        self.command_retries = DEFAULT_COMMAND_RETRIES if command_retries is None else command_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+
+    def next_delay(self, error: exc.Base, idempotent: bool, attempts: dict[type[exc.Base], int]) -> float | None:
+        """
+        Returns seconds to wait before retrying, or None if the error is not retried or its budget is used up.
+        `attempts` counts the retries of one call per exception type and is updated.
+        """
+        # Retrying cannot help while the circuit is open or once the deadline has passed
+        if isinstance(error, (exc.CircuitOpen, exc.DeadlineExceeded)):
+            return None
+        budgets = self.query_retries if idempotent else self.command_retries
+        for error_type, budget in budgets.items():
+            if isinstance(error, error_type):
+                if attempts.get(error_type, 0) >= budget:
+                    return None
+                attempts[error_type] = attempts.get(error_type, 0) + 1
+                retry = sum(attempts.values()) - 1
+                return random.uniform(0, min(self.backoff * 2 ** retry, self.max_backoff))
+        return None
+
+    def hedge_delay(self) -> float | None:
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return None
+        return self.latencies.quantile(self.hedge_quantile)
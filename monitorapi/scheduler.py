@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from .import exceptions as exc
+from .retry import LatencyTracker
+
+
+DEFAULT_WEIGHTS = {"interactive": 4.0, "bulk": 1.0}
+
+_priority: contextvars.ContextVar[str | None] = contextvars.ContextVar("monitorapi_priority", default=None)
+
+@contextmanager
+def priority(name: str) -> Iterator[None]:
+    """
+    Sends every request made inside the block in the priority class `name` of the client's AsyncScheduler.
+
+        with priority("interactive"):
+            part = await client.query("Inventory", "Parts", id=1)
+
+    Like a deadline, the class carries over into tasks started inside the block.
+    """
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> str | None:
+    """
+    The priority class of the enclosing priority() block, None outside of one.
+    """
+    return _priority.get()
+
+
+class AsyncScheduler:
+    """
+    Shares `slots` in-flight requests of one or more AsyncClients between priority classes.
+
+    A free slot goes to the waiting class with the fewest requests in flight relative to its weight,
+    so under contention every class gets its weighted share of the slots and an idle class leaves its share to the others.
+    Classes in `preemptive` go ahead of all queued requests of other classes until they hold their share,
+    and `reserved` slots are only used by them, so they do not wait for a slot to come free.
+    Requests outside a priority() block belong to `default`.
+    Queue wait is tracked per class and reported by stats().
+    """
+
+    def __init__(self,
+        slots: int = 10,
+        weights: dict[str, float] | None = None,
+        preemptive: tuple[str, ...] = ("interactive",),
+        reserved: int = 1,
+        default: str = "bulk",
+    ) -> None:
+        if not 0 <= reserved < slots:
+            raise ValueError(f"reserved must be at least 0 and less than slots ({slots}), got {reserved}")
+        self.slots = slots
+        self.weights = weights or DEFAULT_WEIGHTS
+        if default not in self.weights:
+            raise ValueError(f"Default class {default} has no weight")
+        self.preemptive = preemptive
+        self.reserved = reserved
+        self.default = default
+        self._waiters: dict[str, deque[asyncio.Future[None]]] = {name: deque() for name in self.weights}
+        self._in_flight = {name: 0 for name in self.weights}
+        self._requests = {name: 0 for name in self.weights}
+        self._waits = {name: LatencyTracker() for name in self.weights}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def _may_start(self, name: str) -> bool:
+        return self.in_flight < self.slots - (0 if name in self.preemptive else self.reserved)
+
+    def _over_share(self, name: str) -> bool:
+        busy = sum(weight for other, weight in self.weights.items() if self._waiters[other] or self._in_flight[other])
+        return self._in_flight[name] >= self.slots * self.weights[name] / busy
+
+    def _dispatch(self) -> None:
+        while True:
+            for waiters in self._waiters.values():
+                while waiters and waiters[0].done():
+                    waiters.popleft()
+            candidates = [name for name, waiters in self._waiters.items() if waiters and self._may_start(name)]
+            if not candidates:
+                return
+            name = min(candidates, key=lambda name: (
+                name not in self.preemptive or self._over_share(name),
+                (self._in_flight[name] + 1) / self.weights[name],
+            ))
+            self._in_flight[name] += 1
+            self._waiters[name].popleft().set_result(None)
+
+    async def acquire(self, timeout: float | None = None) -> tuple[str, float]:
+        """
+        Waits for a slot for the current priority class and returns the class and the seconds waited for release().
+        Raises DeadlineExceeded if that takes longer than `timeout` seconds.
+        """
+        name = current_priority() or self.default
+        if name not in self.weights:
+            raise ValueError(f"Unknown priority class {name}")
+        queued = time.monotonic()
+        if not any(self._waiters.values()) and self._may_start(name):
+            self._in_flight[name] += 1
+        else:
+            future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiters[name].append(future)
+            # Reserved or unused share may let it start ahead of the queue
+            self._dispatch()
+            try:
+                if not future.done():
+                    await asyncio.wait_for(future, timeout)
+            except BaseException as e:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just before the wait ended
+                    self.release(name)
+                else:
+                    future.cancel()
+                    self._dispatch()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise exc.DeadlineExceeded(f"Deadline exceeded waiting for a {name} slot")
+                raise
+        waited = time.monotonic() - queued
+        self._requests[name] += 1
+        self._waits[name].record(waited)
+        return name, waited
+
+    def release(self, name: str) -> None:
+        self._in_flight[name] -= 1
+        self._dispatch()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            name: {
+                "weight": self.weights[name],
+                "in_flight": self._in_flight[name],
+                "queued": sum(not future.done() for future in self._waiters[name]),
+                "requests": self._requests[name],
+                "wait_p50": self._waits[name].quantile(0.5),
+                "wait_p99": self._waits[name].quantile(0.99),
+            }
+            for name in self.weights
+        }
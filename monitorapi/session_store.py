@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import IO
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _try_lock_file(file: IO[str]) -> bool:
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock_file(file: IO[str]) -> None:
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock_file(file: IO[str]) -> bool:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock_file(file: IO[str]) -> None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+def _lock_file(file: IO[str], timeout: float | None = None) -> bool:
+    """
+    Polls for the lock of the file, at most `timeout` seconds. Returns False if it did not get it in time.
+    """
+    at = time.monotonic() + timeout if timeout is not None else None
+    while not _try_lock_file(file):
+        if at is not None and time.monotonic() >= at:
+            return False
+        time.sleep(0.05 if at is None else max(min(0.05, at - time.monotonic()), 0))
+    return True
+
+
+class SessionStore(ABC):
+    """
+    Shares session ids between clients using the same credentials, so they reuse one session
+    instead of logging in on startup and suspending each other's sessions.
+
+    acquire/release guard the login of one key, so only one client logs in while the others wait
+    and then take the new session id from the store.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> str | None: pass
+
+    @abstractmethod
+    def set(self, key: str, session_id: str) -> None: pass
+
+    @abstractmethod
+    def discard(self, key: str, session_id: str) -> None:
+        """
+        Removes the stored session id, but only if it still is `session_id`.
+        """
+
+    @abstractmethod
+    def acquire(self, key: str, timeout: float | None = None) -> bool:
+        """
+        Waits at most `timeout` seconds for the lock of the key, returns False if it did not get it in time.
+        """
+
+    @abstractmethod
+    def release(self, key: str) -> None: pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Shares session ids between the clients of one process.
+    """
+
+    def __init__(self) -> None:
+        self._session_ids: dict[str, str] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        return self._session_ids.get(key)
+
+    def set(self, key: str, session_id: str) -> None:
+        self._session_ids[key] = session_id
+
+    def discard(self, key: str, session_id: str) -> None:
+        with self._lock:
+            if self._session_ids.get(key) == session_id:
+                del self._session_ids[key]
+
+    def acquire(self, key: str, timeout: float | None = None) -> bool:
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        return lock.acquire(timeout=-1 if timeout is None else max(timeout, 0))
+
+    def release(self, key: str) -> None:
+        self._locks[key].release()
+
+
+class FileSessionStore(SessionStore):
+    """
+    Shares session ids between processes on the same host through a JSON file.
+    Logins are coordinated with one lock file per key next to it.
+    The file contains live session ids and is only readable by the user running the clients.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._files: dict[str, IO[str]] = {}
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _update(self, key: str, session_id: str | None, expected: str | None = None) -> None:
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            _lock_file(lock_file)
+            try:
+                session_ids = self._read()
+                if expected is not None and session_ids.get(key) != expected:
+                    return
+                if session_id is None:
+                    session_ids.pop(key, None)
+                else:
+                    session_ids[key] = session_id
+                temporary = f"{self.path}.{os.getpid()}.tmp"
+                # Created readable by the user only, os.replace keeps the permissions
+                with os.fdopen(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as file:
+                    json.dump(session_ids, file)
+                os.replace(temporary, self.path)
+            finally:
+                _unlock_file(lock_file)
+
+    def get(self, key: str) -> str | None:
+        return self._read().get(key)
+
+    def set(self, key: str, session_id: str) -> None:
+        self._update(key, session_id)
+
+    def discard(self, key: str, session_id: str) -> None:
+        self._update(key, None, expected=session_id)
+
+    def acquire(self, key: str, timeout: float | None = None) -> bool:
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        file = open(f"{self.path}.{digest}.lock", "a")
+        if not _lock_file(file, timeout):
+            file.close()
+            return False
+        with self._lock:
+            self._files[key] = file
+        return True
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            file = self._files.pop(key)
+        _unlock_file(file)
+        file.close()
+
+
+DEFAULT_SESSION_STORE = MemorySessionStore()
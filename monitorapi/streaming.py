@@ -0,0 +1,67 @@
+import json
+from typing import Any
+
+
+_WHITESPACE = " \t\n\r"
+_SEPARATORS = _WHITESPACE + ","
+_TERMINATORS = _SEPARATORS + "]"
+
+class JSONArrayDecoder:
+    """
+    Incrementally decodes a JSON array fed in text chunks and returns its elements as soon as they are complete.
+    Only the undecoded rest of the text is kept, so memory stays at about one element plus one chunk.
+    A body that is not an array, like a query by id, is decoded as a whole once all of it was fed.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._is_array: bool | None = None
+        self._done = False
+
+    def feed(self, chunk: str) -> list[Any]:
+        self._buffer += chunk
+        if self._is_array is None:
+            stripped = self._buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                return []
+            self._is_array = stripped[0] == "["
+            self._buffer = stripped[1:] if self._is_array else stripped
+        if not self._is_array or self._done:
+            return []
+
+        records = []
+        position = 0
+        buffer = self._buffer
+        while True:
+            while position < len(buffer) and buffer[position] in _SEPARATORS:
+                position += 1
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                self._done = True
+                position += 1
+                break
+            try:
+                record, end = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            # A number cut off by the end of the chunk, like "2." or "1e", decodes to a shorter number,
+            # so an element only counts once the separator after it arrived
+            if end == len(buffer) or buffer[end] not in _TERMINATORS:
+                break
+            records.append(record)
+            position = end
+        self._buffer = buffer[position:]
+        return records
+
+    def close(self) -> list[Any]:
+        """
+        Returns what is left after the last chunk and checks that the body was complete.
+        """
+        if not self._is_array:
+            return [json.loads(self._buffer)] if self._buffer.strip(_WHITESPACE) else []
+        records = self.feed("\n")
+        if not self._done:
+            raise json.JSONDecodeError("Unterminated JSON array", self._buffer, 0)
+        return records
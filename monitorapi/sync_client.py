@@ -1,71 +1,425 @@
 import httpx
 import logging
+import threading
 import time
-from typing import Any
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, Literal
 
-from .base_client import BaseClient, BatchCommandEntity
+from .base_client import BaseClient, BatchCommandEntity, DEFAULT_LIMITS, X_MONITOR_SESSION_ID_HEADER
 from .import exceptions as exc
+from .cache import request_key
+from .chunking import merge_batch_responses, merge_many_responses, split_batch, split_many
+from .circuit import CircuitBreaker
+from .columnar import ResultFormat, convert
+from .deadline import bound_stream, bound_timeout, check_deadline, in_context, remaining
+from .filters import Expression
+from .limiter import SyncLimiter, endpoint_class, is_overload
+from .prepared import PreparedCommand, PreparedQuery
+from .streaming import JSONArrayDecoder
 
 
 logger = logging.getLogger(__name__)
 
 class SyncClient(BaseClient):
 
-    def __init__(self, company_number, username, password, base_url, language_code = "en", api_version = "v1", x_monitor_session_id = None, timeout = 10) -> None:
-        super().__init__(company_number, username, password, base_url, language_code, api_version, x_monitor_session_id, timeout)
-        self.client = httpx.Client(timeout=timeout, verify=False)
+    def __init__(self, company_number, username, password, base_url, language_code = "en", api_version = "v1", x_monitor_session_id = None, timeout = 10, cache = None, coalesce_queries = False, max_workers = 8, limits = None, http2 = False, transport = None, limiter = None, retry = None, log_body_limit = 1000, trace_hook = None, metrics = None, session_store = None, circuit_breaker = None) -> None:
+        super().__init__(company_number, username, password, base_url, language_code, api_version, x_monitor_session_id, timeout, cache, coalesce_queries, retry, log_body_limit, trace_hook, metrics, session_store)
+        # A transport passed in may be shared with other clients, it brings its own limits and HTTP/2 setting
+        self.client = httpx.Client(timeout=timeout, verify=False, limits=limits or DEFAULT_LIMITS, http2=http2, transport=transport)
+        self._owns_transport = transport is None
+        self.limiter: SyncLimiter | None = limiter
+        self.circuit_breaker: CircuitBreaker | None = circuit_breaker
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="monitorapi")
+        # Separate from self.executor so hedged queries inside gather() cannot wait on their own pool
+        self._hedge_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="monitorapi-hedge")
+        self._login_condition = threading.Condition()
         self._login_happening = False
+        self._inflight_queries: dict[str, Future[Any]] = {}
+        self._inflight_lock = threading.Lock()
 
-    def _make_api_request(self, request: httpx.Request) -> httpx.Response:
-        while self._login_happening:
-            time.sleep(0.01)
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_transport:
+            self.client.close()
+
+    def __enter__(self) -> "SyncClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _make_api_request(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        with self._login_condition:
+            self._wait_for_login()
+        check_deadline()
+        group = self.circuit_breaker.acquire(request) if self.circuit_breaker is not None else None
+        try:
+            started = self.limiter.acquire(endpoint_class(request), remaining()) if self.limiter else None
+        except BaseException:
+            if group is not None:
+                self.circuit_breaker.cancel(group)  # type: ignore[union-attr]
+            raise
+        timer = self.metrics.request_started() if self.metrics is not None else None
+        # None when the request neither got a response nor failed in transport
+        failed: bool | None = None
         try:
             response = None
-            request = self._refresh_auth_header(request)
-            response = self.client.send(request)
+            request = bound_timeout(self._refresh_auth_header(request), self.client.timeout)
+            response = self._send(request, stream)
 
             if self._needs_retry(response):
-                self.login()
-                request = self._refresh_auth_header(request)
-                response = self.client.send(request)
+                if stream:
+                    response.close()
+                self._login(request.headers[X_MONITOR_SESSION_ID_HEADER])
+                request = bound_timeout(self._refresh_auth_header(request), self.client.timeout)
+                response = self._send(request, stream)
 
+            failed = is_overload(response)
             return response
+        except exc.DeadlineExceeded:
+            failed = True
+            raise
         except httpx.HTTPError as e:
+            failed = True
+            if isinstance(e, httpx.TimeoutException):
+                check_deadline()
             http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
             raise exc.RequestError(http_error)
         finally:
+            if group is not None:
+                if failed is None:
+                    self.circuit_breaker.cancel(group)  # type: ignore[union-attr]
+                else:
+                    self.circuit_breaker.release(group, failed)  # type: ignore[union-attr]
+            if self.limiter and started is not None:
+                self.limiter.release(started, failed)
+            if self.metrics is not None and timer is not None:
+                self.metrics.request_finished(request, response, timer)
             self._log_request_response(request, response)
 
+    def _send(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        """
+        Sends the request. Under a deadline the body is read in chunks checking the deadline in between,
+        since the httpx timeouts only limit every single read and a slow body could outlast the deadline.
+        """
+        if remaining() is None:
+            return self.client.send(request, stream=stream)
+        response = bound_stream(self.client.send(request, stream=True))
+        if not stream:
+            try:
+                response.read()
+            finally:
+                response.close()
+        return response
+
+    def _wait_for_login(self) -> None:
+        """
+        Blocks while another thread logs in, at most until the deadline. Must be called holding self._login_condition.
+        """
+        if not self._login_happening:
+            return
+        waiting = time.monotonic()
+        while self._login_happening:
+            self._login_condition.wait(check_deadline())
+        if self.metrics is not None:
+            self.metrics.record_login_wait(time.monotonic() - waiting)
+
     def login(self) -> None:
-        self._login_happening = True
+        self._login()
+
+    def _login(self, rejected_session_id: str | None = None) -> None:
+        """
+        Only one thread logs in at a time, the others block until it is done.
+        A thread whose request was rejected skips the login if the session id was already refreshed by another thread,
+        or by another client sharing the session store, which is locked during the login.
+        """
+        with self._login_condition:
+            self._wait_for_login()
+            if rejected_session_id is not None and rejected_session_id != self.x_monitor_session_id:
+                return
+            self._login_happening = True
         try:
-            response = None
-            request = self._create_login_request()
+            if not self.session_store.acquire(self.session_key, check_deadline()):
+                raise exc.DeadlineExceeded("Deadline exceeded waiting for the session store")
             try:
-                response = self.client.send(request)
-                self._handle_login_response(response)
-            except httpx.HTTPError as e:
-                http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
-                raise exc.RequestError(http_error)
+                if self._adopt_stored_session(rejected_session_id):
+                    return
+                if self.metrics is not None:
+                    self.metrics.record_login()
+                response = None
+                request = bound_timeout(self._create_login_request(), self.client.timeout)
+                try:
+                    response = self._send(request)
+                    self._handle_login_response(response)
+                except httpx.HTTPError as e:
+                    if isinstance(e, httpx.TimeoutException):
+                        check_deadline()
+                    http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
+                    raise exc.RequestError(http_error)
+                finally:
+                    self._log_request_response(request, response)
+            finally:
+                self.session_store.release(self.session_key)
         finally:
-            self._log_request_response(request, response)
-            self._login_happening = False
+            with self._login_condition:
+                self._login_happening = False
+                self._login_condition.notify_all()
+
+    def gather(self, calls: Iterable[Callable[[], Any]], return_exceptions: bool = False) -> list[Any]:
+        """
+        Runs the calls, e.g. functools.partial(client.query, "Inventory", "Parts", id=1), on the client's executor
+        with at most `max_workers` running at once and returns their results in order.
+        With return_exceptions=False the first exception is raised and calls that have not started are cancelled,
+        otherwise exceptions are returned in place of results.
+        Must not be called from inside a call running on the same executor.
+        """
+        futures = [self.executor.submit(in_context(call)) for call in calls]
+        results: list[Any] = []
+        try:
+            for future in futures:
+                if return_exceptions:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        results.append(e)
+                else:
+                    results.append(future.result())
+        finally:
+            for future in futures:
+                future.cancel()
+        return results
+
+    def map(self, func: Callable[..., Any], *iterables: Iterable[Any], return_exceptions: bool = False) -> list[Any]:
+        """
+        Like gather, calling func with arguments taken from the iterables, e.g. client.map(lambda id: client.query("Inventory", "Parts", id=id), ids).
+        """
+        return self.gather([partial(func, *args) for args in zip(*iterables)], return_exceptions)
 
     def query(self,
         module: str,
         entity: str,
         id: int | None = None,
         language: str | None  = None,
-        filter: str  | None = None,
+        filter: Expression | str | None = None,
         select: str | None = None,
         expand: str | None = None,
         orderby: str | None = None,
         top: int | None = None,
-        skip: int | None = None
+        skip: int | None = None,
+        result_format: ResultFormat = "dicts",
     ) -> Any:
         request = self._create_query_request(module, entity, id, language, filter, select, expand, orderby, top, skip)
+        result = self._query(request, module, entity)
+        return convert(result, select, result_format)
+
+    def _query(self, request: httpx.Request, module: str, entity: str) -> Any:
+        cached = self._get_cached_query(request)
+        if cached is not None:
+            return cached
+        if not self.coalesce_queries:
+            return self._send_query(request, module, entity)
+
+        key = request_key(request)
+        while True:
+            with self._inflight_lock:
+                future = self._inflight_queries.get(key)
+                if future is None:
+                    future = self._inflight_queries[key] = Future()
+                    break
+            left = check_deadline()
+            try:
+                return future.result(left)
+            except FutureTimeoutError:
+                raise exc.DeadlineExceeded("Deadline exceeded waiting for a coalesced query")
+            except exc.DeadlineExceeded:
+                # The request ran out of the deadline of the caller that sent it, not of this one
+                continue
+        try:
+            try:
+                result = self._send_query(request, module, entity)
+            finally:
+                # Removed before the waiting callers wake up, so those sending it again do not find it
+                with self._inflight_lock:
+                    del self._inflight_queries[key]
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def _send_query(self, request: httpx.Request, module: str, entity: str) -> Any:
+        response, result = self._retry(partial(self._hedge, partial(self._query_attempt, request)), idempotent=True)
+        self._set_cached_query(request, response, module, entity)
+        return result
+
+    def _query_attempt(self, request: httpx.Request) -> tuple[httpx.Response, Any]:
+        started = time.monotonic()
+        response = self._make_api_request(request)
+        result = self._handle_query_response(response)
+        if self.retry is not None:
+            self.retry.latencies.record(time.monotonic() - started)
+        return response, result
+
+    def _send_command(self, request: httpx.Request, handler: Callable[[httpx.Response], Any], invalidated_paths: list[str]) -> Any:
         response = self._make_api_request(request)
-        return self._handle_query_response(response)
+        self._invalidate_cache(*invalidated_paths)
+        return handler(response)
+
+    def _retry(self, call: Callable[[], Any], idempotent: bool) -> Any:
+        attempts: dict[type[exc.Base], int] = {}
+        while True:
+            try:
+                return call()
+            except exc.Base as e:
+                if self.metrics is not None:
+                    self.metrics.record_error(e)
+                delay = self.retry.next_delay(e, idempotent, attempts) if self.retry is not None else None
+                if delay is None:
+                    raise
+                left = remaining()
+                if left is not None and delay >= left:
+                    raise
+                logger.info("Retrying after %s in %.3fs", e.__class__.__name__, delay)
+                time.sleep(delay)
+
+    def _hedge(self, call: Callable[[], Any]) -> Any:
+        delay = self.retry.hedge_delay() if self.retry is not None else None
+        if delay is None:
+            return call()
+        call = in_context(call)
+        first = self._hedge_executor.submit(call)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        logger.debug("No response after %.3fs, sending hedged request", delay)
+        pending = {first, self._hedge_executor.submit(call)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda future: future.exception() is not None):
+                if future.exception() is None or not pending:
+                    return future.result()
+
+    def prepare_query(self,
+        module: str,
+        entity: str,
+        language: str | None = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        result_format: ResultFormat = "dicts",
+    ) -> PreparedQuery:
+        return PreparedQuery(self, module, entity, language, filter, select, expand, orderby, result_format)
+
+    def _query_prepared(self, prepared: PreparedQuery, request: httpx.Request) -> Any:
+        result = self._query(request, prepared.module, prepared.entity)
+        return convert(result, prepared.select, prepared.result_format)
+
+    def prepare_command(self,
+        module: str,
+        namespace: str,
+        command: str,
+        many: bool = False,
+        simulate: bool = False,
+        validate: bool = False,
+        language: str | None = None,
+    ) -> PreparedCommand:
+        return PreparedCommand(self, module, namespace, command, many, simulate, validate, language)
+
+    def _command_prepared(self, prepared: PreparedCommand, request: httpx.Request) -> Any:
+        return self._retry(partial(self._send_command, request, self._handle_command_response, prepared.invalidated_paths), idempotent=False)
+
+    def query_many(self,
+        module: str,
+        entity: str,
+        ids: Iterable[int],
+        language: str | None = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        max_url_length: int = 2000,
+        concurrency: int = 4,
+    ) -> dict[int, Any]:
+        id_filters, select = self._create_id_filters(module, entity, ids, language, filter, select, expand, max_url_length)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pages = list(executor.map(in_context(lambda id_filter: self.query(module, entity, None, language, id_filter, select, expand)), id_filters))
+        return {record["Id"]: record for page in pages for record in page}
+
+    def join(self,
+        records: Iterable[dict[str, Any]],
+        key: str,
+        module: str,
+        entity: str,
+        into: str | None = None,
+        language: str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        max_url_length: int = 2000,
+        concurrency: int = 4,
+    ) -> list[dict[str, Any]]:
+        records = list(records)
+        ids = [record[key] for record in records if record.get(key) is not None]
+        index = self.query_many(module, entity, ids, language, None, select, expand, max_url_length, concurrency)
+        return self._join_records(records, key, into or entity, index)
+
+    def query_stream(self,
+        module: str,
+        entity: str,
+        id: int | None = None,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        top: int | None = None,
+        skip: int | None = None
+    ) -> Iterator[Any]:
+        request = self._create_query_request(module, entity, id, language, filter, select, expand, orderby, top, skip)
+        response = self._make_api_request(request, stream=True)
+        try:
+            if not response.is_success:
+                response.read()
+                self._handle_query_response(response)
+            decoder = JSONArrayDecoder()
+            for chunk in response.iter_text():
+                yield from decoder.feed(chunk)
+            yield from decoder.close()
+        except httpx.HTTPError as e:
+            http_error = e.__doc__.strip() if e.__doc__ else e.__class__.__name__
+            raise exc.RequestError(http_error)
+        finally:
+            response.close()
+
+    def query_iter(self,
+        module: str,
+        entity: str,
+        language: str | None  = None,
+        filter: Expression | str | None = None,
+        select: str | None = None,
+        expand: str | None = None,
+        orderby: str | None = None,
+        skip: int = 0,
+        page_size: int = 500,
+        prefetch: int = 1,
+        result_format: Literal["dicts", "records"] = "dicts",
+    ) -> Iterator[Any]:
+        executor = ThreadPoolExecutor(max_workers=prefetch + 1)
+        pending: deque[Future[Any]] = deque()
+        next_skip = skip
+        try:
+            while True:
+                while len(pending) <= prefetch:
+                    pending.append(executor.submit(in_context(self.query), module, entity, None, language, filter, select, expand, orderby, page_size, next_skip, result_format))
+                    next_skip += page_size
+                page = pending.popleft().result()
+                yield from page
+                if len(page) < page_size:
+                    return
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def command(self,
         module: str,
@@ -75,11 +429,19 @@ class SyncClient(BaseClient):
         simulate: bool = False,
         validate: bool = False,
         language: str | None = None,
-        body: Any | None = None
+        body: Any | None = None,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
     ) -> Any:
+        if many and chunk_size is not None and body is not None and len(body) > chunk_size:
+            chunks = split_many(body, chunk_size)
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(in_context(self.command), module, namespace, command, many, simulate, validate, language, chunk) for _, chunk in chunks]
+                results = [future.exception() or future.result() for future in futures]
+            return merge_many_responses(chunks, results)
         request = self._create_command_request(module, namespace, command, body, many, simulate, validate, language)
-        response = self._make_api_request(request)
-        return self._handle_command_response(response)
+        invalidated_paths = [] if simulate or validate else [f"{module}/{namespace}"]
+        return self._retry(partial(self._send_command, request, self._handle_command_response, invalidated_paths), idempotent=False)
 
     def batch(self,
         commands: list[BatchCommandEntity],
@@ -87,7 +449,16 @@ class SyncClient(BaseClient):
         validate: bool = False,
         language: str | None = None,
         raise_on_error: bool = False,
+        chunk_size: int | None = None,
+        concurrency: int = 4,
     ) -> Any:
+        if chunk_size is not None and len(commands) > chunk_size:
+            chunks = split_batch(commands, chunk_size)
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(in_context(self.batch), chunk, simulate, validate, language) for _, chunk in chunks]
+                results = [future.exception() or future.result() for future in futures]
+            return merge_batch_responses(chunks, results, raise_on_error)
         request = self._create_batch_request(commands, simulate, validate, language)
-        response = self._make_api_request(request)
-        return self._handle_batch_command_response(response, raise_on_error)
\ No newline at end of file
+        invalidated_paths = [] if simulate or validate else [command["Path"] for command in commands]
+        handler = partial(self._handle_batch_command_response, raise_on_error=raise_on_error)
+        return self._retry(partial(self._send_command, request, handler, invalidated_paths), idempotent=False)
\ No newline at end of file
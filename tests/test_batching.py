@@ -0,0 +1,35 @@
+from concurrent.futures import Future
+from typing import Any
+
+import pytest
+
+from monitorapi import exceptions as exc
+from monitorapi.batching import _create_batch_entity, _settle_batch
+
+
+def _entries(count: int) -> list[tuple[Any, Future[Any]]]:
+    return [(_create_batch_entity("Inventory", "Parts", "Update", {"Id": index}), Future()) for index in range(count)]
+
+
+def test_successful_batch_hands_every_caller_its_response() -> None:
+    entries = _entries(3)
+    assert _settle_batch(entries, {"IsSuccessful": True, "Responses": ["a", "b"]}) == []
+    assert [future.result() for _, future in entries] == ["a", "b", None]
+
+
+def test_failed_batch_fails_only_the_failing_entry_and_resends_the_rest() -> None:
+    entries = _entries(4)
+    resend = _settle_batch(entries, {"IsSuccessful": False, "FailingIndex": 2, "ErrorMessage": "Invalid part"})
+    assert resend == [entries[0], entries[1], entries[3]]
+    with pytest.raises(exc.BatchCommandError, match="Invalid part"):
+        entries[2][1].result()
+    assert not any(future.done() for _, future in resend)
+
+
+@pytest.mark.parametrize("failing_index", [None, 4, -1])
+def test_failed_batch_without_valid_index_fails_every_entry(failing_index: int | None) -> None:
+    entries = _entries(4)
+    assert _settle_batch(entries, {"IsSuccessful": False, "FailingIndex": failing_index, "ErrorMessage": "Failed"}) == []
+    for _, future in entries:
+        with pytest.raises(exc.BatchCommandError):
+            future.result()
@@ -0,0 +1,35 @@
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+
+from monitorapi.cache import MemoryCacheBackend, QueryCache
+
+
+def _request(id: int) -> httpx.Request:
+    return httpx.Request("GET", f"https://monitor.local/001.1/api/v1/Inventory/Parts/{id}")
+
+
+def test_stats_count_every_call_from_many_threads() -> None:
+    cache = QueryCache(MemoryCacheBackend(max_entries=10))
+    for id in range(10):
+        cache.set(_request(id), "Inventory", "Parts", b"{}")
+
+    def run(worker: int) -> None:
+        for id in range(2000):
+            cache.get(_request(id % 20))
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(run, range(8)))
+    stats = cache.stats()
+    assert stats.hits == stats.misses == 8 * 1000
+    assert stats.entries == 10
+
+
+def test_stats_count_invalidations_and_evictions() -> None:
+    cache = QueryCache(MemoryCacheBackend(max_entries=2))
+    for id in range(3):
+        cache.set(_request(id), "Inventory", "Parts", b"{}")
+    cache.invalidate("Inventory/Parts/Update")
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.invalidations == 2
+    assert stats.entries == 0
@@ -0,0 +1,94 @@
+import asyncio
+import httpx
+import json
+import logging
+
+import pytest
+
+from monitorapi.async_client import AsyncClient
+from monitorapi.circuit import CircuitBreaker
+from monitorapi.limiter import AIMDLimit, AsyncLimiter
+from monitorapi.session_store import MemorySessionStore
+
+
+def _create_client(delay: float = 0.5, **kwargs) -> AsyncClient:
+    """
+    Client whose queries for the first page answer at once and all others after `delay` seconds.
+    """
+    async def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/login"):
+            return httpx.Response(200, headers={"x-monitor-sessionid": "session"}, json={"SessionSuspended": False})
+        if request.url.params.get("$skip", "0") != "0":
+            await asyncio.sleep(delay)
+        return httpx.Response(200, content=json.dumps([{"Id": 1}]))
+
+    return AsyncClient("001.1", "user", "password", "https://monitor.local", transport=httpx.MockTransport(handle), session_store=MemorySessionStore(), **kwargs)
+
+
+def test_cancelled_prefetch_is_not_logged_as_error(caplog: pytest.LogCaptureFixture) -> None:
+    async def run() -> None:
+        client = _create_client()
+        async for _ in client.query_iter("Inventory", "Parts", page_size=1, prefetch=3):
+            break
+
+    with caplog.at_level(logging.DEBUG, logger="monitorapi"):
+        asyncio.run(run())
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+
+
+def test_partitioned_stopped_early_is_not_logged_as_error(caplog: pytest.LogCaptureFixture) -> None:
+    async def run() -> None:
+        client = _create_client()
+        async for _ in client.query_partitioned("Inventory", "Parts", page_size=1, partitions=4):
+            break
+
+    with caplog.at_level(logging.DEBUG, logger="monitorapi"):
+        asyncio.run(run())
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+
+
+def test_cancelled_requests_do_not_lower_the_concurrency_limit() -> None:
+    limiter = AsyncLimiter(AIMDLimit(initial=20))
+
+    async def run() -> None:
+        client = _create_client(limiter=limiter)
+        await client.login()
+        tasks = [asyncio.create_task(client.query("Inventory", "Parts", skip=1)) for _ in range(10)]
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
+    assert limiter.limit == 20
+    assert limiter.in_flight == 0
+
+
+def _cancel_slow_queries(client: AsyncClient, count: int) -> None:
+    async def run() -> None:
+        await client.login()
+        tasks = [asyncio.create_task(client.query("Inventory", "Parts", skip=1)) for _ in range(count)]
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_cancelled_requests_do_not_open_the_circuit() -> None:
+    breaker = CircuitBreaker(min_requests=3, window=10)
+    client = _create_client(circuit_breaker=breaker)
+    _cancel_slow_queries(client, 10)
+    assert breaker.state("query") == "closed"
+    assert asyncio.run(client.query("Inventory", "Parts")) == [{"Id": 1}]
+
+
+def test_cancelled_probe_keeps_the_circuit_half_open() -> None:
+    breaker = CircuitBreaker(min_requests=1, window=1, reset_timeout=0.0)
+    breaker.release(breaker.acquire(httpx.Request("GET", "https://monitor.local")), failed=True)
+    client = _create_client(circuit_breaker=breaker)
+    _cancel_slow_queries(client, 1)
+    assert breaker.state("query") == "half_open"
+    assert asyncio.run(client.query("Inventory", "Parts")) == [{"Id": 1}]
+    assert breaker.state("query") == "closed"
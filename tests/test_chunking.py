@@ -0,0 +1,90 @@
+import pytest
+
+from monitorapi import exceptions as exc
+from monitorapi.chunking import merge_batch_responses, merge_many_responses, split_batch, split_many
+
+
+def test_split_many_keeps_offsets() -> None:
+    assert split_many(list(range(5)), 2) == [(0, [0, 1]), (2, [2, 3]), (4, [4])]
+
+
+def test_split_and_merge_many_keep_item_order() -> None:
+    body = [{"Id": id} for id in range(7)]
+    chunks = split_many(body, 3)
+    results = [[item["Id"] * 10 for item in chunk] for _, chunk in chunks]
+    assert merge_many_responses(chunks, results) == [id * 10 for id in range(7)]
+
+
+def test_merge_many_fills_chunks_without_body() -> None:
+    chunks = split_many([1, 2, 3], 2)
+    assert merge_many_responses(chunks, [None, [3]]) == [None, None, 3]
+
+
+@pytest.mark.parametrize("result", [{"Id": 1}, [1], [1, 2, 3]])
+def test_merge_many_rejects_results_not_matching_items(result: object) -> None:
+    chunks = split_many([1, 2, 3, 4], 2)
+    with pytest.raises(exc.ChunkedCommandError) as raised:
+        merge_many_responses(chunks, [result, [3, 4]])
+    assert isinstance(raised.value.errors[0], exc.CommandError)
+    assert raised.value.result == [None, None, 3, 4]
+
+
+def test_merge_many_reports_failed_chunks() -> None:
+    chunks = split_many([1, 2, 3, 4], 2)
+    error = exc.CommandConflict("Conflict")
+    with pytest.raises(exc.ChunkedCommandError) as raised:
+        merge_many_responses(chunks, [[1, 2], error])
+    assert raised.value.errors == {2: error}
+    assert raised.value.result == [1, 2, None, None]
+
+
+def _command(name: str, forward: str | None = None, receive: str | None = None) -> dict:
+    return {"Path": f"Inventory/Parts/{name}", "Body": None, "ForwardPropertyName": forward, "ReceivingPropertyName": receive}
+
+
+def test_split_batch_keeps_chained_commands_together() -> None:
+    commands = [
+        _command("a"),
+        _command("b", forward="Id"),
+        _command("c", receive="PartId"),
+        _command("d"),
+        _command("e"),
+    ]
+    chunks = split_batch(commands, 2)
+    assert [(offset, [command["Path"][-1] for command in chunk]) for offset, chunk in chunks] == [
+        (0, ["a"]),
+        (1, ["b", "c"]),
+        (3, ["d", "e"]),
+    ]
+
+
+def test_split_batch_makes_a_long_chain_a_chunk_of_its_own() -> None:
+    commands = [_command("a"), _command("b", forward="Id"), _command("c", forward="Id"), _command("d", receive="Id"), _command("e")]
+    assert [(offset, len(chunk)) for offset, chunk in split_batch(commands, 2)] == [(0, 1), (1, 3), (4, 1)]
+
+
+def test_merge_batch_responses_offsets_failing_index() -> None:
+    commands = [_command(name) for name in "abcdef"]
+    chunks = split_batch(commands, 2)
+    results = [
+        {"IsSuccessful": True, "Responses": [1, 2]},
+        {"IsSuccessful": False, "FailingIndex": 1, "ErrorMessage": "Invalid d"},
+        {"IsSuccessful": False, "FailingIndex": 0, "ErrorMessage": "Invalid e"},
+    ]
+    merged = merge_batch_responses(chunks, results, raise_on_error=False)
+    assert merged["IsSuccessful"] is False
+    assert merged["FailingIndex"] == 3
+    assert merged["ErrorMessage"] == "Invalid d"
+    assert merged["Errors"] == [{"FailingIndex": 3, "ErrorMessage": "Invalid d"}, {"FailingIndex": 4, "ErrorMessage": "Invalid e"}]
+    assert merged["Responses"] == [1, 2, None, None, None, None]
+    with pytest.raises(exc.BatchCommandError, match="At index 3"):
+        merge_batch_responses(chunks, results, raise_on_error=True)
+
+
+def test_merge_batch_responses_reports_raised_chunks() -> None:
+    chunks = split_batch([_command(name) for name in "abc"], 2)
+    error = exc.RequestError("Timeout")
+    with pytest.raises(exc.ChunkedCommandError) as raised:
+        merge_batch_responses(chunks, [{"IsSuccessful": True, "Responses": [1, 2]}, error], raise_on_error=False)
+    assert raised.value.errors == {2: error}
+    assert raised.value.result["Responses"] == [1, 2, None]
@@ -0,0 +1,159 @@
+import asyncio
+import httpx
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import pytest
+
+from monitorapi import exceptions as exc
+from monitorapi.async_client import AsyncClient
+from monitorapi.deadline import deadline
+from monitorapi.scheduler import AsyncScheduler, priority
+from monitorapi.session_store import MemorySessionStore
+from monitorapi.sync_client import SyncClient
+
+
+DELAY = 0.5
+
+def _login(request: httpx.Request) -> httpx.Response | None:
+    if request.url.path.endswith("/login"):
+        return httpx.Response(200, headers={"x-monitor-sessionid": "session"}, json={"SessionSuspended": False})
+    return None
+
+
+def _slow_body() -> Iterator[bytes]:
+    time.sleep(DELAY)
+    yield json.dumps([{"Id": 1}]).encode()
+
+
+def _create_sync_client(queries: list[httpx.Request]) -> SyncClient:
+    """
+    Client whose queries answer with a body taking DELAY seconds, recorded in `queries`.
+    """
+    lock = threading.Lock()
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        response = _login(request)
+        if response is not None:
+            return response
+        with lock:
+            queries.append(request)
+        return httpx.Response(200, content=_slow_body())
+
+    return SyncClient("001.1", "user", "password", "https://monitor.local", coalesce_queries=True, transport=httpx.MockTransport(handle), session_store=MemorySessionStore())
+
+
+def _create_async_client(queries: list[httpx.Request], **kwargs) -> AsyncClient:
+    async def handle(request: httpx.Request) -> httpx.Response:
+        response = _login(request)
+        if response is not None:
+            return response
+        queries.append(request)
+        await asyncio.sleep(DELAY)
+        return httpx.Response(200, content=json.dumps([{"Id": 1}]))
+
+    return AsyncClient("001.1", "user", "password", "https://monitor.local", coalesce_queries=True, transport=httpx.MockTransport(handle), session_store=MemorySessionStore(), **kwargs)
+
+
+def _query_within(client: SyncClient, seconds: float) -> list[dict]:
+    with deadline(seconds):
+        return client.query("Inventory", "Parts")
+
+
+def test_sync_follower_sends_again_after_leader_deadline() -> None:
+    queries: list[httpx.Request] = []
+    client = _create_sync_client(queries)
+    client.login()
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(_query_within, client, 0.2)
+        time.sleep(0.05)
+        follower = executor.submit(client.query, "Inventory", "Parts")
+        with pytest.raises(exc.DeadlineExceeded):
+            leader.result()
+        assert follower.result() == [{"Id": 1}]
+    assert len(queries) == 2
+    client.close()
+
+
+def test_sync_follower_waits_at_most_until_its_deadline() -> None:
+    queries: list[httpx.Request] = []
+    client = _create_sync_client(queries)
+    client.login()
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(client.query, "Inventory", "Parts")
+        time.sleep(0.05)
+        started = time.monotonic()
+        with pytest.raises(exc.DeadlineExceeded):
+            _query_within(client, 0.1)
+        assert time.monotonic() - started < 0.3
+        assert leader.result() == [{"Id": 1}]
+    assert len(queries) == 1
+    client.close()
+
+
+def test_async_follower_sends_again_after_leader_deadline() -> None:
+    queries: list[httpx.Request] = []
+
+    async def run() -> None:
+        client = _create_async_client(queries)
+        await client.login()
+
+        async def leader() -> None:
+            with deadline(0.2):
+                await client.query("Inventory", "Parts")
+
+        leading = asyncio.create_task(leader())
+        await asyncio.sleep(0.05)
+        following = asyncio.create_task(client.query("Inventory", "Parts"))
+        with pytest.raises(exc.DeadlineExceeded):
+            await leading
+        assert await following == [{"Id": 1}]
+        await client.close()
+
+    asyncio.run(run())
+    assert len(queries) == 2
+
+
+def test_async_follower_waits_at_most_until_its_deadline() -> None:
+    queries: list[httpx.Request] = []
+
+    async def run() -> None:
+        client = _create_async_client(queries)
+        await client.login()
+        leading = asyncio.create_task(client.query("Inventory", "Parts"))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        with pytest.raises(exc.DeadlineExceeded), deadline(0.1):
+            await client.query("Inventory", "Parts")
+        assert time.monotonic() - started < 0.3
+        assert await leading == [{"Id": 1}]
+        await client.close()
+
+    asyncio.run(run())
+    assert len(queries) == 1
+
+
+def test_async_queries_of_other_priority_classes_are_not_shared() -> None:
+    queries: list[httpx.Request] = []
+    scheduler = AsyncScheduler(slots=4)
+
+    async def run() -> None:
+        client = _create_async_client(queries, scheduler=scheduler)
+        await client.login()
+
+        async def interactive() -> list[dict]:
+            with priority("interactive"):
+                return await client.query("Inventory", "Parts")
+
+        results = await asyncio.gather(client.query("Inventory", "Parts"), client.query("Inventory", "Parts"), interactive())
+        assert results == [[{"Id": 1}]] * 3
+        await client.close()
+
+    asyncio.run(run())
+    assert len(queries) == 2
+    stats = scheduler.stats()
+    assert stats["bulk"]["requests"] == 1
+    assert stats["interactive"]["requests"] == 1
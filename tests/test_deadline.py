@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from monitorapi import exceptions as exc
+from monitorapi.async_client import AsyncClient
+from monitorapi.deadline import deadline
+from monitorapi.session_store import FileSessionStore, MemorySessionStore
+from monitorapi.sync_client import SyncClient
+
+
+class _SlowBodyHandler(BaseHTTPRequestHandler):
+    """
+    Answers logins at once and queries with a body trickling in over about two seconds.
+    """
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("content-length") or 0))
+        body = b'{"SessionSuspended": false}'
+        self.send_response(200)
+        self.send_header("x-monitor-sessionid", "session")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        chunks = [b"[", *(b'{"Id": %d},' % id for id in range(1, 20)), b'{"Id": 20}]']
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(sum(map(len, chunks))))
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+                time.sleep(0.1)
+        except OSError:
+            pass
+
+
+@pytest.fixture(scope="module")
+def base_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowBodyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_sync_deadline_limits_slow_body(base_url: str) -> None:
+    client = SyncClient("001.1", "user", "password", base_url, session_store=MemorySessionStore())
+    client.login()
+    started = time.monotonic()
+    with pytest.raises(exc.DeadlineExceeded), deadline(0.5):
+        client.query("Inventory", "Parts")
+    assert time.monotonic() - started < 1.0
+    client.close()
+
+
+def test_async_deadline_limits_slow_body(base_url: str) -> None:
+    async def run() -> float:
+        client = AsyncClient("001.1", "user", "password", base_url, session_store=MemorySessionStore())
+        await client.login()
+        started = time.monotonic()
+        with pytest.raises(exc.DeadlineExceeded), deadline(0.5):
+            await client.query("Inventory", "Parts")
+        elapsed = time.monotonic() - started
+        await client.close()
+        return elapsed
+
+    assert asyncio.run(run()) < 1.0
+
+
+def test_deadline_limits_streamed_query(base_url: str) -> None:
+    client = SyncClient("001.1", "user", "password", base_url, session_store=MemorySessionStore())
+    client.login()
+    started = time.monotonic()
+    with pytest.raises(exc.DeadlineExceeded), deadline(0.5):
+        for _ in client.query_stream("Inventory", "Parts"):
+            pass
+    assert time.monotonic() - started < 1.0
+    client.close()
+
+
+@pytest.mark.parametrize("store", ["memory", "file"])
+def test_deadline_limits_waiting_for_session_store(base_url: str, store: str, tmp_path: Path) -> None:
+    path = str(tmp_path / "sessions.json")
+    session_store = MemorySessionStore() if store == "memory" else FileSessionStore(path)
+    # The lock held by another client, or another process, logging in
+    holder = session_store if store == "memory" else FileSessionStore(path)
+    client = SyncClient("001.1", "user", "password", base_url, session_store=session_store)
+    assert holder.acquire(client.session_key)
+    started = time.monotonic()
+    with pytest.raises(exc.DeadlineExceeded), deadline(0.5):
+        client.login()
+    assert time.monotonic() - started < 1.0
+    holder.release(client.session_key)
+    client.close()
+
+
+def test_async_deadline_limits_waiting_for_session_store(base_url: str) -> None:
+    session_store = MemorySessionStore()
+
+    async def run() -> float:
+        client = AsyncClient("001.1", "user", "password", base_url, session_store=session_store)
+        session_store.acquire(client.session_key)
+        started = time.monotonic()
+        with pytest.raises(exc.DeadlineExceeded), deadline(0.5):
+            await client.login()
+        elapsed = time.monotonic() - started
+        await client.close()
+        return elapsed
+
+    assert asyncio.run(run()) < 1.0
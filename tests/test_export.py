@@ -0,0 +1,66 @@
+import csv
+import gzip
+import httpx
+import json
+from pathlib import Path
+
+import pytest
+
+from monitorapi import exceptions as exc
+from monitorapi.export import export
+from monitorapi.session_store import MemorySessionStore
+from monitorapi.sync_client import SyncClient
+
+
+RECORDS = [{"Id": id, "Name": f"Part {id}"} for id in range(1, 24)]
+
+def _create_client(skips: list[int], fail_at: int | None = None) -> SyncClient:
+    """
+    Client querying RECORDS, recording the $skip of every query and failing the one at `fail_at`.
+    """
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/login"):
+            return httpx.Response(200, headers={"x-monitor-sessionid": "session"}, json={"SessionSuspended": False})
+        skip, top = int(request.url.params["$skip"]), int(request.url.params["$top"])
+        skips.append(skip)
+        if skip == fail_at:
+            raise httpx.ConnectError("Connection refused")
+        return httpx.Response(200, content=json.dumps(RECORDS[skip:skip + top]))
+
+    return SyncClient("001.1", "user", "password", "https://monitor.local", transport=httpx.MockTransport(handle), session_store=MemorySessionStore())
+
+
+def _read(path: Path) -> list[dict]:
+    data = gzip.decompress(path.read_bytes()) if path.suffix == ".gz" else path.read_bytes()
+    if ".csv" in path.suffixes:
+        return [{"Id": int(row["Id"]), "Name": row["Name"]} for row in csv.DictReader(data.decode().splitlines())]
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+@pytest.mark.parametrize("name", ["parts.ndjson", "parts.ndjson.gz", "parts.csv", "parts.csv.gz"])
+def test_interrupted_export_resumes_from_checkpoint(tmp_path: Path, name: str) -> None:
+    path = tmp_path / name
+    skips: list[int] = []
+    with pytest.raises(exc.RequestError):
+        export(_create_client(skips, fail_at=15), "Inventory", "Parts", str(path), page_size=5, prefetch=1)
+    checkpoint = json.loads(Path(f"{path}.checkpoint").read_text())
+    assert checkpoint["skip"] == 15
+    assert checkpoint["rows"] == 15
+
+    skips.clear()
+    assert export(_create_client(skips), "Inventory", "Parts", str(path), page_size=5, prefetch=1) == len(RECORDS)
+    assert min(skips) == 15
+    assert _read(path) == RECORDS
+    assert not Path(f"{path}.checkpoint").exists()
+
+
+def test_checkpoint_of_another_export_starts_over(tmp_path: Path) -> None:
+    path = tmp_path / "parts.ndjson"
+    skips: list[int] = []
+    with pytest.raises(exc.RequestError):
+        export(_create_client(skips, fail_at=10), "Inventory", "Parts", str(path), page_size=5, prefetch=0)
+
+    skips.clear()
+    assert export(_create_client(skips), "Inventory", "Parts", str(path), page_size=5, prefetch=0, filter="Id gt 0") == len(RECORDS)
+    assert min(skips) == 0
+    assert _read(path) == RECORDS
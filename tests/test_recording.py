@@ -0,0 +1,35 @@
+import time
+
+from monitorapi.recording import ReplayTransport, replay
+from monitorapi.session_store import MemorySessionStore
+from monitorapi.sync_client import SyncClient
+
+
+def _traffic(count: int, duration: float) -> list[dict]:
+    """
+    `count` queries all started at once, each answered after `duration` seconds.
+    """
+    return [
+        {"t": 0.0, "d": duration, "m": "GET", "u": f"/001.1/api/v1/Inventory/Parts/{id}", "q": None, "s": 200, "h": {"content-type": "application/json"}, "b": f'{{"Id": {id}}}'}
+        for id in range(1, count + 1)
+    ]
+
+
+def test_replay_is_not_limited_by_max_workers() -> None:
+    traffic = _traffic(16, 0.2)
+    client = SyncClient("001.1", "user", "password", "https://monitor.local", max_workers=2, transport=ReplayTransport(traffic), session_store=MemorySessionStore())
+    started = time.monotonic()
+    summary = replay(client, traffic)
+    assert time.monotonic() - started < 0.6
+    assert summary["requests"] == 16
+    assert summary["errors"] == 0
+    client.close()
+
+
+def test_replay_keeps_to_concurrency() -> None:
+    traffic = _traffic(4, 0.2)
+    client = SyncClient("001.1", "user", "password", "https://monitor.local", transport=ReplayTransport(traffic), session_store=MemorySessionStore())
+    summary = replay(client, traffic, concurrency=2)
+    assert summary["seconds"] >= 0.4
+    assert summary["requests"] == 4
+    client.close()
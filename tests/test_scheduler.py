@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from monitorapi.scheduler import AsyncScheduler, priority
+
+
+@pytest.mark.parametrize("slots, reserved", [(1, 1), (2, 3), (4, -1)])
+def test_invalid_reserved_slots_are_rejected(slots: int, reserved: int) -> None:
+    with pytest.raises(ValueError):
+        AsyncScheduler(slots=slots, reserved=reserved)
+
+
+def test_default_class_gets_a_slot_with_one_reserved() -> None:
+    scheduler = AsyncScheduler(slots=2, reserved=1)
+
+    async def run() -> str:
+        name, _ = await asyncio.wait_for(scheduler.acquire(), 1)
+        scheduler.release(name)
+        return name
+
+    assert asyncio.run(run()) == "bulk"
+
+
+def test_slots_are_shared_by_weight() -> None:
+    scheduler = AsyncScheduler(slots=4, weights={"a": 3, "b": 1}, preemptive=(), reserved=0, default="a")
+    started = {"a": 0, "b": 0}
+
+    async def job(name: str) -> None:
+        with priority(name):
+            acquired, _ = await scheduler.acquire()
+        started[acquired] += 1
+        await asyncio.sleep(0.01)
+        scheduler.release(acquired)
+
+    async def run() -> None:
+        tasks = [asyncio.create_task(job(name)) for name in ["a"] * 100 + ["b"] * 100]
+        await asyncio.sleep(0.1)
+        assert 2 <= started["a"] / started["b"] <= 4
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert scheduler.in_flight == 0
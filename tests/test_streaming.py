@@ -0,0 +1,55 @@
+import json
+from typing import Any
+
+import pytest
+
+from monitorapi.streaming import JSONArrayDecoder
+
+
+RECORDS = [
+    {"Id": 1, "Name": "Quote \" and backslash \\ ]", "Price": 2.5},
+    {"Id": 2, "Name": "Brackets [ { , } ]", "Tags": ["a", "b\\\"c"]},
+    {"Id": 3, "Name": "Unicode åäö \\u00e5", "Price": -1.25e3},
+    {"Id": 4, "Name": None, "Nested": {"List": [1, 2, [3]], "Empty": {}}},
+    10,
+    "text ]",
+    True,
+]
+
+def _decode(text: str, size: int) -> list[Any]:
+    decoder = JSONArrayDecoder()
+    records = []
+    for start in range(0, len(text), size):
+        records += decoder.feed(text[start:start + size])
+    return records + decoder.close()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 1000])
+def test_array_split_at_any_chunk_boundary(size: int) -> None:
+    assert _decode(json.dumps(RECORDS, indent=1), size) == RECORDS
+
+
+def test_elements_are_returned_once_complete() -> None:
+    decoder = JSONArrayDecoder()
+    assert decoder.feed(' [{"Id": 1}, {"Id"') == [{"Id": 1}]
+    assert decoder.feed(": 2}, 12") == [{"Id": 2}]
+    # The number may still continue in the next chunk
+    assert decoder.feed("3") == []
+    assert decoder.feed("]") == [123]
+    assert decoder.close() == []
+
+
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_body_that_is_not_an_array_is_decoded_as_a_whole(size: int) -> None:
+    assert _decode(json.dumps({"Id": 1, "Name": "[\"x\"]"}), size) == [{"Id": 1, "Name": "[\"x\"]"}]
+
+
+def test_empty_array() -> None:
+    assert _decode(" [ ] ", 1) == []
+
+
+def test_unterminated_array_raises() -> None:
+    decoder = JSONArrayDecoder()
+    decoder.feed('[{"Id": 1},')
+    with pytest.raises(json.JSONDecodeError):
+        decoder.close()